@@ -3,6 +3,9 @@ from datetime import datetime, timedelta, timezone
 from dateutil import tz
 from tabulate import tabulate
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from grmm.peers import PeerGraph
+
 def log(x): print(x, flush=True)
 
 SUPABASE_URL = os.environ.get("SUPABASE_URL","").rstrip("/")
@@ -20,21 +23,7 @@ ARTICLES = f"{SUPABASE_URL}/rest/v1/articles"
 EVENTS   = f"{SUPABASE_URL}/rest/v1/events"
 SIGNALS  = f"{SUPABASE_URL}/rest/v1/signals"
 
-# Minimal ticker->sector map (expand later)
-SECTOR = {
-    "JPM":"Financials","GS":"Financials","MS":"Financials","C":"Financials","BAC":"Financials","WFC":"Financials",
-    "BLK":"Financials","BX":"Financials",
-    "AAPL":"Information Technology","MSFT":"Information Technology","NVDA":"Information Technology",
-    "GOOGL":"Communication Services","META":"Communication Services","AMZN":"Consumer Discretionary","TSLA":"Consumer Discretionary"
-}
-
-# Historical priors for event types (toy; expand later)
-PRIORS = {
-    ("CEO_CHANGE","Financials"): {"1D": -0.012, "5D": -0.004, "20D": 0.000},
-    ("CEO_CHANGE","Information Technology"): {"1D": -0.008, "5D": -0.003, "20D": 0.000},
-    ("CEO_CHANGE","Communication Services"): {"1D": -0.010, "5D": -0.003, "20D": 0.000},
-    ("CEO_CHANGE","Consumer Discretionary"): {"1D": -0.010, "5D": -0.004, "20D": 0.000},
-}
+graph = PeerGraph.from_price_cache()
 
 def fmt_pct(x):
     if x is None: return "-"
@@ -59,24 +48,37 @@ def get_signals_for_event(event_id):
     r = requests.get(url, headers=HEADERS, timeout=30); r.raise_for_status()
     return r.json()
 
-def suggest_trade(ticker, horizon_pred):
+def stored_hedge(ticker, sigs):
+    """(hedge_ticker, hedge_ratio) from the primary leg the signals job wrote, or None."""
+    for srow in sigs or []:
+        primary = srow.get("role") == "primary" or (srow.get("role") is None and srow.get("ticker") == ticker)
+        if primary and srow.get("hedge_ticker") and srow.get("hedge_ratio") is not None:
+            return srow["hedge_ticker"], float(srow["hedge_ratio"])
+    return None
+
+def suggest_trade(ticker, horizon_pred, sigs=None):
     """
     Simple narration + hedge suggestion.
     horizon_pred is dict like {"1D": -0.012, "5D": -0.004, "20D": 0.0}
+    The hedge is the one stored on the event's signal rows (betas estimated
+    by the signals job); graph defaults only when there are no signals yet.
     """
     one_d = horizon_pred.get("1D")
     if one_d is None: return "No suggestion."
+    etf, beta = stored_hedge(ticker, sigs) or graph.hedge(ticker)
+    if etf is None:
+        etf, beta = "SPY", 1.0
     if one_d < -0.002:
-        return f"SHORT {ticker}, hedge sector via XLF (beta ≈ 1.1) to isolate idiosyncratic move."
+        return f"SHORT {ticker}, hedge sector via {etf} (beta ≈ {beta:.2f}) to isolate idiosyncratic move."
     elif one_d > 0.002:
-        return f"LONG {ticker}, hedge with short XLF (beta ≈ 1.1)."
+        return f"LONG {ticker}, hedge with short {etf} (beta ≈ {beta:.2f})."
     return "Small/neutral edge; monitor for follow-ups (successor named, guidance)."
 
 def scale_priors_with_sentiment(event):
     et = event.get("event_type")
     tkr = event.get("primary_ticker")
-    sector = SECTOR.get(tkr, "Unknown")
-    base = PRIORS.get((et, sector))
+    sector = graph.sector_of(tkr)
+    base = graph.ref.priors(et, sector)
     if not base:
         return None, sector
 
@@ -119,7 +121,8 @@ def main():
         conf = ev.get("confidence")
 
         scaled, sector = scale_priors_with_sentiment(ev)
-        base = PRIORS.get((ev.get("event_type"), sector))
+        sigs = get_signals_for_event(eid)
+        base = graph.ref.priors(ev.get("event_type"), sector)
 
         print(f"{shown}) {ev.get('event_type')} — {tkr} ({headline[:80] + ('…' if len(headline)>80 else '')})")
         print(f"   Sentiment: {sentiment if sentiment is not None else '-'} "
@@ -136,17 +139,16 @@ def main():
                   f"1D: {fmt_pct(scaled.get('1D'))}, "
                   f"5D: {fmt_pct(scaled.get('5D'))}, "
                   f"20D: {fmt_pct(scaled.get('20D'))}")
-            print(f"   Suggested trade idea: {suggest_trade(tkr, scaled)}")
+            print(f"   Suggested trade idea: {suggest_trade(tkr, scaled, sigs)}")
         else:
             print("   Forecast: not available (missing priors for this sector/ticker).")
 
         # Also show any stored signals (if your signals job already wrote them)
-        sigs = get_signals_for_event(eid)
         if sigs:
             table = []
-            for srow in sorted(sigs, key=lambda r: r["horizon"]):
-                table.append([srow["horizon"], fmt_pct(srow["predicted_return"]), srow.get("direction")])
-            print(tabulate(table, headers=["Horizon","Predicted Return","Dir"], tablefmt="github"))
+            for srow in sorted(sigs, key=lambda r: (r.get("role") != "primary", r.get("ticker") or "", r["horizon"])):
+                table.append([srow.get("ticker") or "-", srow["horizon"], fmt_pct(srow["predicted_return"]), srow.get("direction")])
+            print(tabulate(table, headers=["Ticker","Horizon","Predicted Return","Dir"], tablefmt="github"))
         print()
 
     if shown == 0:
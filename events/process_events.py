@@ -2,6 +2,9 @@ import os, sys, json, time, regex as re
 from datetime import datetime, timedelta, timezone
 import requests
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from grmm import refdata, workqueue
+
 def log(x): print(x, flush=True)
 
 SUPABASE_URL = os.environ.get("SUPABASE_URL","").rstrip("/")
@@ -19,15 +22,6 @@ JSON_HEADERS = {**HEADERS, "Content-Type":"application/json"}
 ARTICLES = f"{SUPABASE_URL}/rest/v1/articles"
 EVENTS   = f"{SUPABASE_URL}/rest/v1/events"
 
-# Minimal alias map (extend over time)
-ALIASES = {
-    "JPMorgan": "JPM", "JP Morgan": "JPM", "JPMorgan Chase": "JPM", "JPM": "JPM",
-    "Goldman Sachs": "GS", "Morgan Stanley": "MS", "Citigroup": "C", "Bank of America": "BAC",
-    "Wells Fargo": "WFC", "BlackRock": "BLK", "Blackstone": "BX",
-    "Apple": "AAPL", "Microsoft": "MSFT", "Alphabet": "GOOGL", "Google": "GOOGL", "Meta": "META",
-    "Amazon": "AMZN", "Tesla": "TSLA", "Nvidia": "NVDA"
-}
-
 CEO_PATTERNS = [
     r"(?i)\b(steps?\s+down|resign(?:ed|s)?|to\s+resign)\b.*\bas\s+CEO\b",
     r"(?i)\b(retire(?:s|ment))\b.*\bas\s+CEO\b",
@@ -38,10 +32,11 @@ def is_ceo_change(text: str) -> bool:
     return any(re.search(p, text) for p in CEO_PATTERNS)
 
 def find_ticker(text: str):
-    for alias, tkr in ALIASES.items():
-        if alias.lower() in text.lower():
-            return tkr
-    return None
+    return refdata.matcher().find_ticker(text)
+
+def find_tickers(text: str):
+    """All tickers named in the text (alias-source order, no duplicates)."""
+    return refdata.matcher().find_tickers(text)
 
 def recent_articles(hours=6, limit=300):
     url = f"{ARTICLES}?select=*&order=first_seen_at.desc&limit={limit}"
@@ -56,6 +51,11 @@ def recent_articles(hours=6, limit=300):
         if dt >= cutoff: out.append(a)
     return out
 
+def articles_by_id(ids):
+    url = f"{ARTICLES}?select=*&article_id=in.({','.join(str(i) for i in ids)})"
+    r = requests.get(url, headers=HEADERS, timeout=30); r.raise_for_status()
+    return r.json()
+
 def already_have_event(article_id):
     url = f"{EVENTS}?select=event_id&article_id=eq.{article_id}&limit=1"
     r = requests.get(url, headers=HEADERS, timeout=30); r.raise_for_status()
@@ -79,22 +79,54 @@ def insert_event(article, extracted):
         raise RuntimeError(f"Insert event failed {r.status_code}: {r.text[:300]}")
 
 
+def handle_article(a):
+    """Create a CEO_CHANGE event for one article if it qualifies; returns 1 if made."""
+    if already_have_event(a["article_id"]):
+        return 0
+    headline = f"{a.get('title','')}. {a.get('summary','')}"
+    if not headline.strip(): return 0
+    if not is_ceo_change(headline): return 0
+    tkr = find_ticker(headline)
+    affected = [t for t in find_tickers(headline) if t != tkr]
+    extracted = {"headline": headline, "primary_ticker": tkr, "affected_tickers": affected,
+                 "refdata_version": refdata.load().version}
+    insert_event(a, extracted)
+    return 1
+
+def process_queue(queue):
+    made = 0
+    def handle(ids):
+        nonlocal made
+        try:
+            arts = articles_by_id(ids)
+        except Exception as e:
+            log(f"⚠️ Failed to fetch articles {ids[0]}..{ids[-1]}: {e}")
+            return ids
+        failed = []
+        for a in arts:
+            try:
+                made += handle_article(a)
+            except Exception as e:
+                failed.append(a["article_id"])
+                log(f"⚠️ Failed to insert event: {e}")
+        return failed
+    done, failed = workqueue.drain(queue, "events", handle, batch=300, log=log,
+                                   follow=float(os.environ.get("WORK_QUEUE_FOLLOW", 0)))
+    log(f"Processed {done} queued articles ({failed} failed); created events: {made}")
+    return 0
+
 def process():
+    queue = workqueue.from_env(SUPABASE_URL, HEADERS)
+    if queue:
+        return process_queue(queue)
     arts = recent_articles(hours=6, limit=300)
     log(f"Fetched {len(arts)} recent articles")
     made = 0
     for a in arts:
-        if already_have_event(a["article_id"]):
-            continue
-        headline = f"{a.get('title','')}. {a.get('summary','')}"
-        if not headline.strip(): continue
-        if is_ceo_change(headline):
-            tkr = find_ticker(headline)
-            extracted = {"headline": headline, "primary_ticker": tkr}
-            try:
-                insert_event(a, extracted); made += 1
-            except Exception as e:
-                log(f"⚠️ Failed to insert event: {e}")
+        try:
+            made += handle_article(a)
+        except Exception as e:
+            log(f"⚠️ Failed to insert event: {e}")
     log(f"Created events: {made}")
     return 0
 
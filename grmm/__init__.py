@@ -0,0 +1,6 @@
+"""
+Code shared by the GRMM jobs (events/, sentiment/, signals/, ...).
+
+The jobs run as plain scripts, so each one puts the repo root on sys.path
+before importing from here.
+"""
@@ -0,0 +1,145 @@
+"""
+Ticker -> sector / sector ETF / peers graph, with hedge betas.
+
+Signals fan an event out from its primary ticker to the tickers it names
+(affected_tickers) and to sector peers, and each leg is hedged with its
+sector ETF. Sectors, ETFs and default betas come from the reference-data
+snapshot (grmm.refdata). Hedge ratios come from betas estimated on a local
+price cache (daily closes); tickers without enough history fall back to the
+security's beta in the snapshot, then to its sector default.
+
+The price cache is refreshed with
+
+    python -m grmm.peers refresh [--force]   # needs yfinance; no-op if < 1 day old unless --force
+
+and is just JSON: {"dates": [...], "close": {ticker: [...]}}, aligned on dates.
+"""
+import json, os, sys, time
+
+import numpy as np
+
+from grmm import refdata
+
+MARKET_ETF = "SPY"  # hedge for tickers with no known sector
+
+MIN_OBS = 60         # daily returns needed before we trust an estimated beta
+BETA_CLAMP = (0.2, 3.0)
+
+PRICE_CACHE = os.environ.get(
+    "GRMM_PRICE_CACHE",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache", "grmm", "prices.json"),
+)
+PRICE_CACHE_MAX_AGE_S = 24 * 3600
+
+
+def load_price_cache(path=PRICE_CACHE):
+    """-> (dates, {ticker: np.ndarray of closes}); empty if the cache is missing or unreadable."""
+    try:
+        with open(path) as f:
+            raw = json.load(f)
+    except (OSError, ValueError):
+        return [], {}
+    closes = {t: np.asarray(v, dtype=float) for t, v in (raw.get("close") or {}).items()}
+    return raw.get("dates") or [], closes
+
+def estimate_betas(closes, pairs):
+    """
+    OLS beta of each ticker's daily log returns on its hedge's, for
+    pairs = [(ticker, hedge), ...]. NaN closes (missing days) are dropped
+    pairwise. Returns {ticker: beta} for tickers with >= MIN_OBS returns.
+    """
+    out = {}
+    for tkr, hedge in pairs:
+        a, b = closes.get(tkr), closes.get(hedge)
+        if a is None or b is None or len(a) != len(b):
+            continue
+        ra, rb = np.diff(np.log(a)), np.diff(np.log(b))
+        ok = np.isfinite(ra) & np.isfinite(rb)
+        if ok.sum() < MIN_OBS:
+            continue
+        ra, rb = ra[ok], rb[ok]
+        var = rb.var()
+        if var <= 0:
+            continue
+        beta = float(((ra - ra.mean()) * (rb - rb.mean())).mean() / var)
+        out[tkr] = min(max(beta, BETA_CLAMP[0]), BETA_CLAMP[1])
+    return out
+
+
+class PeerGraph:
+    """Sector membership, peers and hedge (ETF, beta) per ticker, over a refdata snapshot."""
+
+    def __init__(self, snapshot=None, betas=None):
+        self.ref = snapshot or refdata.load()
+        self.version = self.ref.version
+        self.sector_info = {s["name"]: s for s in self.ref.sectors()}
+        self.betas = dict(betas or {})
+
+    @classmethod
+    def from_price_cache(cls, path=PRICE_CACHE, **kw):
+        g = cls(**kw)
+        _, closes = load_price_cache(path)
+        if closes:
+            g.betas.update(estimate_betas(closes, [(t, g.hedge_etf(t)) for t in closes]))
+        return g
+
+    def sector_of(self, ticker):
+        sec = self.ref.security(ticker)
+        return sec["sector"] if sec else "Unknown"
+
+    def hedge_etf(self, ticker):
+        info = self.sector_info.get(self.sector_of(ticker))
+        return (info and info["etf"]) or MARKET_ETF
+
+    def peers_of(self, ticker):
+        return [t for t in self.ref.members().get(self.sector_of(ticker), []) if t != ticker]
+
+    def beta(self, ticker):
+        if ticker in self.betas:
+            return self.betas[ticker]
+        sec = self.ref.security(ticker)
+        if sec and sec["beta"] is not None:
+            return sec["beta"]
+        info = self.sector_info.get(self.sector_of(ticker))
+        return info["beta"] if info else 1.0
+
+    def hedge(self, ticker):
+        """-> (hedge ticker, hedge ratio); (None, 0.0) if the ticker is itself the hedge or unknown."""
+        if not ticker:
+            return None, 0.0
+        etf = self.hedge_etf(ticker)
+        if etf == ticker:
+            return None, 0.0
+        return etf, self.beta(ticker)
+
+
+def refresh_price_cache(tickers, path=PRICE_CACHE, period="1y", max_age_s=PRICE_CACHE_MAX_AGE_S):
+    """Download daily closes with yfinance into the price cache unless it is fresh."""
+    try:
+        if time.time() - os.path.getmtime(path) < max_age_s:
+            return False
+    except OSError:
+        pass
+    import yfinance as yf
+    df = yf.download(sorted(set(tickers)), period=period, interval="1d", auto_adjust=True, progress=False)["Close"]
+    payload = {
+        "dates": [d.strftime("%Y-%m-%d") for d in df.index],
+        "close": {t: [None if np.isnan(x) else float(x) for x in df[t].to_numpy()] for t in df.columns},
+    }
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(payload, f)
+    os.replace(tmp, path)
+    return True
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["refresh"] and sys.argv[2:] in ([], ["--force"]):
+        ref = refdata.load()
+        tickers = ref.tickers() + [s["etf"] for s in ref.sectors() if s["etf"]] + [MARKET_ETF]
+        max_age = 0 if sys.argv[2:] else PRICE_CACHE_MAX_AGE_S
+        print("refreshed" if refresh_price_cache(tickers, max_age_s=max_age) else "price cache is fresh", flush=True)
+    else:
+        print("usage: python -m grmm.peers refresh [--force]", file=sys.stderr)
+        sys.exit(2)
@@ -0,0 +1,34 @@
+"""
+Reference data shared by every job: securities, aliases, sectors (ETF and
+default hedge beta) and event priors.
+
+source.json is the editable source of truth. It is compiled into
+snapshot.bin, a compact binary file that jobs mmap instead of parsing; run
+
+    python -m grmm.refdata build
+
+after editing source.json and commit both. `load()` returns the process-wide
+Snapshot (GRMM_REFDATA overrides the path). Its `version` is written on
+events and signals so every row records which reference data produced it.
+"""
+import functools, os
+
+from .snapshot import Snapshot, SnapshotError, build, source_version
+from .matcher import AliasMatcher, load_matcher
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SOURCE_PATH = os.path.join(HERE, "source.json")
+SNAPSHOT_PATH = os.environ.get("GRMM_REFDATA", os.path.join(HERE, "snapshot.bin"))
+
+@functools.lru_cache(maxsize=None)
+def load(path=SNAPSHOT_PATH):
+    return Snapshot(path)
+
+@functools.lru_cache(maxsize=None)
+def matcher(path=SNAPSHOT_PATH):
+    return load_matcher(load(path))
+
+__all__ = [
+    "AliasMatcher", "Snapshot", "SnapshotError",
+    "build", "load", "load_matcher", "matcher", "source_version",
+]
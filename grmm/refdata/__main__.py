@@ -0,0 +1,32 @@
+"""
+    python -m grmm.refdata build [source.json] [snapshot.bin]
+    python -m grmm.refdata info  [snapshot.bin]
+"""
+import json, sys, time
+
+from . import SNAPSHOT_PATH, SOURCE_PATH, Snapshot, build
+
+def main(argv):
+    cmd = argv[0] if argv else None
+    if cmd == "build":
+        src_path = argv[1] if len(argv) > 1 else SOURCE_PATH
+        out_path = argv[2] if len(argv) > 2 else SNAPSHOT_PATH
+        with open(src_path) as f:
+            blob = build(json.load(f))
+        with open(out_path, "wb") as f:
+            f.write(blob)
+        print(f"wrote {out_path} ({len(blob)} bytes, version {Snapshot(out_path).version})")
+        return 0
+    if cmd == "info":
+        t0 = time.perf_counter()
+        snap = Snapshot(argv[1] if len(argv) > 1 else SNAPSHOT_PATH)
+        ms = (time.perf_counter() - t0) * 1000
+        print(f"version {snap.version}; {len(snap.tickers())} securities, "
+              f"{len(snap.aliases())} aliases, {len(snap.sectors())} sectors, "
+              f"event types {snap.event_types()}; opened in {ms:.2f} ms")
+        return 0
+    print(__doc__.strip(), file=sys.stderr)
+    return 2
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
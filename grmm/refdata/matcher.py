@@ -0,0 +1,84 @@
+"""
+Alias matcher: one Aho-Corasick pass over the lowercased text finds every
+alias it contains, instead of a substring test per alias. Semantics match
+the old `alias.lower() in text.lower()` loop, including the primary ticker
+being the one whose alias comes first in the source.
+
+Building the automaton is the expensive part for a large security master, so
+it is pickled to the cache dir under the snapshot version and
+MATCHER_FORMAT, and reused by every job that loads the same snapshot. Bump
+MATCHER_FORMAT whenever AliasMatcher's structure or matching changes, so
+stale pickles (including the ones in the Actions cache) are not loaded.
+"""
+import os, pickle
+from collections import deque
+
+MATCHER_FORMAT = 1
+CACHE_DIR = os.environ.get("GRMM_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "grmm"))
+
+
+class AliasMatcher:
+    def __init__(self, aliases):
+        """aliases: [(lowercased alias, ticker, rank)]"""
+        goto, fail, out = [{}], [0], [[]]
+        for alias, ticker, rank in aliases:
+            node = 0
+            for ch in alias:
+                nxt = goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[node][ch] = nxt
+                    goto.append({}); fail.append(0); out.append([])
+                node = nxt
+            out[node].append((rank, ticker))
+        queue = deque(goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in goto[node].items():
+                queue.append(nxt)
+                f = fail[node]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fail[nxt] = goto[f].get(ch, 0)
+                out[nxt] = out[nxt] + out[fail[nxt]]
+        self.goto, self.fail, self.out = goto, fail, out
+
+    def matches(self, text):
+        """Set of (rank, ticker) for every alias found in text."""
+        goto, fail, out = self.goto, self.fail, self.out
+        found, node = set(), 0
+        for ch in text.lower():
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if out[node]:
+                found.update(out[node])
+        return found
+
+    def find_tickers(self, text):
+        """All tickers named in the text, in source alias order, no duplicates."""
+        return list(dict.fromkeys(t for _, t in sorted(self.matches(text))))
+
+    def find_ticker(self, text):
+        found = self.matches(text)
+        return min(found)[1] if found else None
+
+
+def load_matcher(snapshot, cache_dir=CACHE_DIR):
+    """AliasMatcher for this snapshot, from the on-disk cache when possible."""
+    path = os.path.join(cache_dir, f"matcher-v{MATCHER_FORMAT}-{snapshot.version}.pkl")
+    try:
+        with open(path, "rb") as f:
+            return pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+        pass
+    m = AliasMatcher(snapshot.aliases())
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump(m, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+    except OSError:
+        pass  # read-only cache dir; just don't persist
+    return m
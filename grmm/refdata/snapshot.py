@@ -0,0 +1,221 @@
+"""
+Binary snapshot format for reference data.
+
+Layout (little-endian):
+
+    magic "GRRD" | u16 format | u16 reserved | u32 index_len | index JSON
+    then fixed-width record sections and a string pool, at the offsets the
+    index lists.
+
+Strings are (u32 offset, u16 length) into the pool. Securities are sorted by
+ticker, so lookups are binary searches over the mmap and nothing is decoded
+until it is asked for. Aliases are sorted by lowercased alias and carry their
+source rank; the matcher reads them all at once (see matcher.py).
+
+The version is a hash of the canonicalised source, so the same source always
+builds byte-identical snapshots with the same version.
+"""
+import functools, hashlib, json, math, mmap, struct
+
+MAGIC = b"GRRD"
+FORMAT = 1
+HEADER = struct.Struct("<4sHHI")
+ANY_SECTOR = 0xFFFF
+
+SECURITY = struct.Struct("<IHIHHd")   # ticker, name, sector idx, beta (nan = none)
+SECTOR   = struct.Struct("<IHIHd")    # name, etf, default beta
+ALIAS    = struct.Struct("<IHII")     # lowercased alias, security idx, rank (source order)
+PRIOR    = struct.Struct("<IHHIHd")   # event type, sector idx, horizon, value
+
+
+class SnapshotError(Exception):
+    pass
+
+
+def source_version(src):
+    canon = json.dumps(src, sort_keys=True, separators=(",", ":")).encode()
+    return hashlib.sha256(canon).hexdigest()[:16]
+
+def build(src):
+    """Source dict (see source.json) -> snapshot bytes."""
+    pool, offsets = bytearray(), {}
+    def s(text):
+        if text not in offsets:
+            b = text.encode()
+            offsets[text] = (len(pool), len(b))
+            pool.extend(b)
+        return offsets[text]
+
+    sectors = list(src["sectors"])
+    sector_idx = {sec["name"]: i for i, sec in enumerate(sectors)}
+    for sec in src["securities"]:
+        if sec["sector"] not in sector_idx:
+            sector_idx[sec["sector"]] = len(sectors)
+            sectors.append({"name": sec["sector"], "etf": "", "beta": 1.0})
+
+    secs = sorted(src["securities"], key=lambda x: x["ticker"].encode())
+    sec_idx = {sec["ticker"]: i for i, sec in enumerate(secs)}
+
+    aliases, rank = {}, 0
+    for sec in src["securities"]:
+        for alias in sec.get("aliases", []):
+            key = alias.lower()
+            if key not in aliases:
+                aliases[key] = (sec_idx[sec["ticker"]], rank)
+            rank += 1
+
+    sections = {}
+    def pack(name, rec, rows):
+        sections[name] = rec, [rec.pack(*r) for r in rows]
+
+    pack("securities", SECURITY, [
+        (*s(x["ticker"]), *s(x.get("name", "")), sector_idx[x["sector"]],
+         float(x["beta"]) if x.get("beta") is not None else math.nan) for x in secs])
+    pack("sectors", SECTOR, [
+        (*s(x["name"]), *s(x.get("etf") or ""), float(x.get("beta", 1.0))) for x in sectors])
+    pack("aliases", ALIAS, [
+        (*s(a), i, r) for a, (i, r) in sorted(aliases.items(), key=lambda kv: kv[0].encode())])
+    pack("priors", PRIOR, [
+        (*s(p["event_type"]), ANY_SECTOR if p["sector"] == "*" else sector_idx[p["sector"]], *s(h), float(v))
+        for p in src["priors"] for h, v in p.items() if h not in ("event_type", "sector")])
+
+    index = {"version": source_version(src), "sections": {}}
+    # offsets depend on the index length, so size the index with placeholders first
+    def layout(base):
+        off, out = base, {}
+        for name, (rec, rows) in sections.items():
+            out[name] = [off, len(rows)]
+            off += rec.size * len(rows)
+        out["strings"] = [off, len(pool)]
+        return out
+    index["sections"] = layout(0)
+    while True:
+        blob = json.dumps(index, sort_keys=True).encode()
+        sections_at = layout(HEADER.size + len(blob))
+        if sections_at == index["sections"]:
+            break
+        index["sections"] = sections_at
+
+    out = bytearray(HEADER.pack(MAGIC, FORMAT, 0, len(blob)))
+    out += blob
+    for rec, rows in sections.values():
+        for r in rows:
+            out += r
+    out += pool
+    return bytes(out)
+
+
+class Snapshot:
+    """Read-only view over a snapshot file via mmap. Lookups decode lazily."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, fmt, _, n = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or fmt != FORMAT:
+            raise SnapshotError(f"{path}: not a format-{FORMAT} reference snapshot")
+        index = json.loads(self._mm[HEADER.size:HEADER.size + n])
+        self.version = index["version"]
+        self._sections = index["sections"]
+        self._str_base = self._sections["strings"][0]
+        self._sectors = None
+        self._members = None
+        self._priors = None
+
+    def _str(self, off, n):
+        base = self._str_base + off
+        return self._mm[base:base + n].decode()
+
+    def _count(self, name):
+        return self._sections[name][1]
+
+    def _rec(self, name, rec, i):
+        return rec.unpack_from(self._mm, self._sections[name][0] + i * rec.size)
+
+    def _bisect(self, name, rec, key):
+        """Index of the record whose first string equals key, or None."""
+        lo, hi = 0, self._count(name)
+        key = key.encode()
+        while lo < hi:
+            mid = (lo + hi) // 2
+            off, n = self._rec(name, rec, mid)[:2]
+            base = self._str_base + off
+            probe = self._mm[base:base + n]
+            if probe < key: lo = mid + 1
+            elif probe > key: hi = mid
+            else: return mid
+        return None
+
+    # ---- securities ----
+    def _security(self, i):
+        t_off, t_n, n_off, n_n, sec_i, beta = self._rec("securities", SECURITY, i)
+        return {
+            "ticker": self._str(t_off, t_n),
+            "name": self._str(n_off, n_n),
+            "sector": self.sectors()[sec_i]["name"],
+            "beta": None if math.isnan(beta) else beta,
+        }
+
+    @functools.lru_cache(maxsize=4096)
+    def security(self, ticker):
+        if not ticker: return None
+        i = self._bisect("securities", SECURITY, ticker)
+        return None if i is None else self._security(i)
+
+    def tickers(self):
+        return [self._str(*self._rec("securities", SECURITY, i)[:2]) for i in range(self._count("securities"))]
+
+    # ---- sectors ----
+    def sectors(self):
+        if self._sectors is None:
+            rows = []
+            for i in range(self._count("sectors")):
+                n_off, n_n, e_off, e_n, beta = self._rec("sectors", SECTOR, i)
+                rows.append({"name": self._str(n_off, n_n), "etf": self._str(e_off, e_n) or None, "beta": beta})
+            self._sectors = rows
+        return self._sectors
+
+    def members(self):
+        """sector name -> [tickers]; built once on first use."""
+        if self._members is None:
+            names = [s["name"] for s in self.sectors()]
+            out = {}
+            for i in range(self._count("securities")):
+                t_off, t_n, _, _, sec_i, _ = self._rec("securities", SECURITY, i)
+                out.setdefault(names[sec_i], []).append(self._str(t_off, t_n))
+            self._members = out
+        return self._members
+
+    # ---- aliases ----
+    def aliases(self):
+        """[(lowercased alias, ticker, rank)] in alias order."""
+        out = []
+        for i in range(self._count("aliases")):
+            a_off, a_n, sec_i, rank = self._rec("aliases", ALIAS, i)
+            t_off, t_n = self._rec("securities", SECURITY, sec_i)[:2]
+            out.append((self._str(a_off, a_n), self._str(t_off, t_n), rank))
+        return out
+
+    # ---- priors ----
+    def _prior_table(self):
+        if self._priors is None:
+            names = [s["name"] for s in self.sectors()]
+            table = {}
+            for i in range(self._count("priors")):
+                e_off, e_n, sec_i, h_off, h_n, v = self._rec("priors", PRIOR, i)
+                sector = "*" if sec_i == ANY_SECTOR else names[sec_i]
+                table.setdefault((self._str(e_off, e_n), sector), {})[self._str(h_off, h_n)] = v
+            self._priors = table
+        return self._priors
+
+    def priors(self, event_type, sector=None, fallback=True):
+        """Horizon -> base return for (event_type, sector); sector "*" if none/unknown and fallback."""
+        table = self._prior_table()
+        hit = table.get((event_type, sector))
+        if hit is None and fallback:
+            hit = table.get((event_type, "*"))
+        return dict(hit) if hit else None
+
+    def event_types(self):
+        return sorted({et for et, _ in self._prior_table()})
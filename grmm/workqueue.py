@@ -0,0 +1,255 @@
+"""
+Pending-work queue for the events -> sentiment -> signals pipeline.
+
+Instead of re-reading a lookback window on every run, each stage claims the
+rows that were queued for it, processes them and marks them done. Postgres
+triggers enqueue work as rows land, so per-run work is proportional to new
+data and nothing falls out of a window.
+
+Claims carry a lease: a worker that dies leaves its items to be reclaimed
+once the lease expires, and completing an item is only accepted from the
+worker that currently holds it. Writes in the stages stay idempotent
+(already_have_event / already_have_signal), so a reclaimed item is safe.
+
+Schema (run once in Supabase):
+
+    create table work_queue (
+      stage text not null,
+      item_id bigint not null,
+      enqueued_at timestamptz not null default now(),
+      claimed_by text,
+      lease_until timestamptz,
+      attempts integer not null default 0,
+      done_at timestamptz,
+      primary key (stage, item_id)
+    );
+    create index work_queue_pending on work_queue (stage, enqueued_at) where done_at is null;
+
+    create or replace function enqueue_work() returns trigger language plpgsql as $$
+    begin
+      insert into work_queue (stage, item_id)
+      values (tg_argv[0], (to_jsonb(new) ->> tg_argv[1])::bigint)
+      on conflict do nothing;
+      perform pg_notify('work_queue', tg_argv[0]);
+      return new;
+    end $$;
+
+    create trigger articles_to_events after insert on articles
+      for each row execute function enqueue_work('events', 'article_id');
+    create trigger events_to_sentiment after insert on events
+      for each row execute function enqueue_work('sentiment', 'event_id');
+    create trigger events_to_signals after update of sentiment on events
+      for each row when (old.sentiment is null and new.sentiment is not null)
+      execute function enqueue_work('signals', 'event_id');
+
+    create or replace function claim_work(p_stage text, p_worker text, p_limit int, p_lease_s int)
+    returns setof bigint language sql as $$
+      update work_queue q
+         set claimed_by = p_worker,
+             lease_until = now() + make_interval(secs => p_lease_s),
+             attempts = q.attempts + 1
+       where (q.stage, q.item_id) in (
+         select stage, item_id from work_queue
+          where stage = p_stage and done_at is null and attempts < 5
+            and (lease_until is null or lease_until < now())
+          order by enqueued_at
+          limit p_limit
+          for update skip locked)
+      returning q.item_id;
+    $$;
+
+    create or replace function complete_work(p_stage text, p_worker text, p_ids bigint[])
+    returns void language sql as $$
+      update work_queue set done_at = now(), lease_until = null
+       where stage = p_stage and item_id = any(p_ids) and claimed_by = p_worker and done_at is null;
+    $$;
+
+    -- returns the released ids that have used up their attempts
+    drop function if exists release_work(text, text, bigint[], int);  -- used to return void
+    create or replace function release_work(p_stage text, p_worker text, p_ids bigint[], p_delay_s int)
+    returns setof bigint language sql as $$
+      with released as (
+        update work_queue set lease_until = now() + make_interval(secs => p_delay_s)
+         where stage = p_stage and item_id = any(p_ids) and claimed_by = p_worker and done_at is null
+        returning item_id, attempts)
+      select item_id from released where attempts >= 5;
+    $$;
+
+    create or replace function add_work(p_stage text, p_ids bigint[])
+    returns void language sql as $$
+      insert into work_queue (stage, item_id) select p_stage, unnest(p_ids) on conflict do nothing;
+      select pg_notify('work_queue', p_stage);
+    $$;
+
+    -- Supabase exposes the public schema over PostgREST and lets PUBLIC
+    -- execute new functions; keep the queue to the service role.
+    alter table work_queue enable row level security;
+    revoke execute on function claim_work(text, text, int, int) from public, anon, authenticated;
+    revoke execute on function complete_work(text, text, bigint[]) from public, anon, authenticated;
+    revoke execute on function release_work(text, text, bigint[], int) from public, anon, authenticated;
+    revoke execute on function add_work(text, bigint[]) from public, anon, authenticated;
+
+Items that fail 5 times stay in the table with done_at null for inspection.
+Signals are queued once an event has sentiment; events the sentiment stage
+gives up on (no headline, or out of attempts) are handed to signals
+directly, so they still get neutral signals as they do in window mode.
+
+Jobs opt in with WORK_QUEUE=supabase; the default (off) keeps the lookback
+windows. LocalQueue is an in-process SQLite stand-in with the same
+semantics, for tests and local runs.
+"""
+import json, os, socket, sqlite3, time, uuid
+from datetime import datetime, timedelta, timezone
+
+import requests
+
+DEFAULT_LEASE_S = 300
+RETRY_DELAY_S = 60      # failed items become claimable again after this
+MAX_ATTEMPTS = 5
+
+def worker_id():
+    return f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+
+
+class RestQueue:
+    """work_queue in Supabase, driven through the PostgREST rpc endpoints."""
+
+    def __init__(self, supabase_url, headers, worker=None):
+        self.rpc = f"{supabase_url}/rest/v1/rpc"
+        self.headers = {**headers, "Content-Type": "application/json"}
+        self.worker = worker or worker_id()
+
+    def _call(self, fn, body):
+        r = requests.post(f"{self.rpc}/{fn}", headers=self.headers, data=json.dumps(body), timeout=30)
+        if r.status_code not in (200, 204):
+            raise RuntimeError(f"{fn} failed {r.status_code}: {r.text[:300]}")
+        return r.json() if r.status_code == 200 and r.content else None
+
+    @staticmethod
+    def _ids(rows):
+        # setof bigint comes back as a bare list of ids
+        return [int(r) if not isinstance(r, dict) else int(next(iter(r.values()))) for r in rows or []]
+
+    def enqueue(self, stage, ids):
+        if ids:
+            self._call("add_work", {"p_stage": stage, "p_ids": list(ids)})
+
+    def claim(self, stage, limit=100, lease_s=DEFAULT_LEASE_S):
+        return self._ids(self._call("claim_work", {"p_stage": stage, "p_worker": self.worker,
+                                                   "p_limit": limit, "p_lease_s": lease_s}))
+
+    def complete(self, stage, ids):
+        if ids:
+            self._call("complete_work", {"p_stage": stage, "p_worker": self.worker, "p_ids": list(ids)})
+
+    def release(self, stage, ids, delay_s=RETRY_DELAY_S):
+        """Make ids claimable again after delay_s; returns those that are out of attempts."""
+        if not ids:
+            return []
+        return self._ids(self._call("release_work", {"p_stage": stage, "p_worker": self.worker,
+                                                     "p_ids": list(ids), "p_delay_s": delay_s}))
+
+
+class LocalQueue:
+    """SQLite stand-in for RestQueue. `clock` returns an aware datetime (override in tests)."""
+
+    def __init__(self, path=":memory:", worker=None, clock=None):
+        self.db = sqlite3.connect(path, isolation_level=None)
+        self.worker = worker or worker_id()
+        self.clock = clock or (lambda: datetime.now(timezone.utc))
+        self.db.execute("""
+            create table if not exists work_queue (
+              stage text not null, item_id integer not null,
+              enqueued_at text not null, claimed_by text, lease_until text,
+              attempts integer not null default 0, done_at text,
+              primary key (stage, item_id))""")
+
+    def _now(self):
+        return self.clock().isoformat()
+
+    def enqueue(self, stage, ids):
+        now = self._now()
+        self.db.executemany(
+            "insert or ignore into work_queue (stage, item_id, enqueued_at) values (?, ?, ?)",
+            [(stage, int(i), now) for i in ids])
+
+    def claim(self, stage, limit=100, lease_s=DEFAULT_LEASE_S):
+        now = self.clock()
+        until = (now + timedelta(seconds=lease_s)).isoformat()
+        self.db.execute("begin immediate")
+        try:
+            ids = [r[0] for r in self.db.execute(
+                """select item_id from work_queue
+                    where stage = ? and done_at is null and attempts < ?
+                      and (lease_until is null or lease_until < ?)
+                    order by enqueued_at, item_id limit ?""",
+                (stage, MAX_ATTEMPTS, now.isoformat(), limit))]
+            self.db.executemany(
+                """update work_queue set claimed_by = ?, lease_until = ?, attempts = attempts + 1
+                    where stage = ? and item_id = ?""",
+                [(self.worker, until, stage, i) for i in ids])
+            self.db.execute("commit")
+        except Exception:
+            self.db.execute("rollback")
+            raise
+        return ids
+
+    def complete(self, stage, ids):
+        self.db.executemany(
+            """update work_queue set done_at = ?, lease_until = null
+                where stage = ? and item_id = ? and claimed_by = ? and done_at is null""",
+            [(self._now(), stage, int(i), self.worker) for i in ids])
+
+    def release(self, stage, ids, delay_s=RETRY_DELAY_S):
+        until = (self.clock() + timedelta(seconds=delay_s)).isoformat()
+        args = [(until, stage, int(i), self.worker) for i in ids]
+        self.db.executemany(
+            """update work_queue set lease_until = ?
+                where stage = ? and item_id = ? and claimed_by = ? and done_at is null""", args)
+        return [int(i) for _, _, i, _ in args if self.db.execute(
+            """select 1 from work_queue where stage = ? and item_id = ? and claimed_by = ?
+                  and done_at is null and attempts >= ?""",
+            (stage, i, self.worker, MAX_ATTEMPTS)).fetchone()]
+
+
+def from_env(supabase_url, headers):
+    """Queue selected by WORK_QUEUE ("off" | "supabase" | "local:<sqlite path>"), or None."""
+    mode = os.environ.get("WORK_QUEUE", "off")
+    if mode == "supabase":
+        return RestQueue(supabase_url, headers)
+    if mode.startswith("local:"):
+        return LocalQueue(mode[len("local:"):])
+    return None
+
+def drain(queue, stage, handle, batch=100, lease_s=DEFAULT_LEASE_S, follow=None, log=print,
+          give_up=None):
+    """
+    Claim `stage` items in batches and pass the ids to handle(ids), which
+    returns the ids it failed on; the rest are completed, failures released
+    for retry after RETRY_DELAY_S. Failures that have used all MAX_ATTEMPTS
+    are passed to give_up(ids), if given. Stops when the queue is empty, or
+    with follow=<seconds> keeps polling at that interval so new rows are
+    picked up within seconds.
+    Returns (done, failed) counts.
+    """
+    done = failed = 0
+    while True:
+        ids = queue.claim(stage, limit=batch, lease_s=lease_s)
+        if not ids:
+            if not follow:
+                return done, failed
+            time.sleep(follow)
+            continue
+        bad = set(handle(ids) or ())
+        queue.complete(stage, [i for i in ids if i not in bad])
+        dead = queue.release(stage, [i for i in ids if i in bad])
+        if dead:
+            log(f"[{stage}] giving up on {len(dead)} after {MAX_ATTEMPTS} attempts")
+            if give_up:
+                try:
+                    give_up(dead)
+                except Exception as ex:
+                    log(f"[{stage}] give_up failed: {ex}")
+        done += len(ids) - len(bad)
+        failed += len(bad)
+        log(f"[{stage}] claimed {len(ids)}; done {len(ids) - len(bad)}; failed {len(bad)}")
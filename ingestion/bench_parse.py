@@ -0,0 +1,51 @@
+"""
+Benchmark: streaming entry reader vs feedparser on synthetic feeds.
+
+    python ingestion/bench_parse.py [items ...]
+
+Prints wall time and peak traced memory for each parser at each feed size.
+feedparser is optional here; if it isn't installed only the stream path runs.
+"""
+import sys, time, tracemalloc
+from feedstream import iter_entries
+
+MAX_ENTRIES = 30
+
+def make_rss(n):
+    items = "".join(
+        f"<item><title>Headline {i}: Acme Corp CEO to step down</title>"
+        f"<link>https://example.com/news/{i}</link>"
+        f"<guid>https://example.com/news/{i}</guid>"
+        f"<description>{'Body text. ' * 40}</description>"
+        f"<pubDate>Mon, 07 Oct 2024 13:{i % 60:02d}:00 GMT</pubDate></item>"
+        for i in range(n)
+    )
+    return f'<?xml version="1.0"?><rss version="2.0"><channel><title>bench</title>{items}</channel></rss>'.encode()
+
+def run(name, fn, raw, reps=5):
+    best = float("inf")
+    for _ in range(reps):
+        t0 = time.perf_counter()
+        fn(raw)
+        best = min(best, time.perf_counter() - t0)
+    tracemalloc.start()
+    fn(raw)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"  {name:<11} {best*1000:9.2f} ms   peak {peak/1024:9.1f} KiB")
+
+def main(sizes):
+    try:
+        import feedparser
+    except ImportError:
+        feedparser = None
+        print("feedparser not installed; benchmarking stream path only")
+    for n in sizes:
+        raw = make_rss(n)
+        print(f"{n} items ({len(raw)/1024:.0f} KiB), keeping {MAX_ENTRIES}:")
+        run("stream", lambda b: list(iter_entries(b, limit=MAX_ENTRIES)), raw)
+        if feedparser:
+            run("feedparser", lambda b: feedparser.parse(b).entries[:MAX_ENTRIES], raw)
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or [50, 500, 5000])
@@ -1,6 +1,8 @@
 import os, time, json, sys, random
 from datetime import datetime, timezone
-import requests, feedparser
+import requests
+from feedstream import parse_entries
+import scheduler
 
 def log(msg): print(msg, flush=True)
 
@@ -12,6 +14,7 @@ if not SUPABASE_URL or not SUPABASE_SERVICE_KEY:
     sys.exit(1)
 
 ARTICLES_ENDPOINT = f"{SUPABASE_URL}/rest/v1/articles"
+FEED_STATE_ENDPOINT = f"{SUPABASE_URL}/rest/v1/feed_state"
 HEADERS_DB = {
     "apikey": SUPABASE_SERVICE_KEY,
     "Authorization": f"Bearer {SUPABASE_SERVICE_KEY}",
@@ -35,6 +38,10 @@ UA = (
     "Chrome/124.0 Safari/537.36"
 )
 
+MAX_ENTRIES = 30  # new entries per feed per run
+FEED_PARSER = os.environ.get("FEED_PARSER", "stream")  # "stream" | "feedparser"
+FEED_SCHEDULE = os.environ.get("FEED_SCHEDULE", "adaptive")  # "adaptive" | "all"
+
 session = requests.Session()
 session.headers.update({"User-Agent": UA})
 
@@ -45,19 +52,50 @@ def ts(dt):
     except Exception:
         return None
 
-def fetch_feed_bytes(url, tries=3, timeout=20):
-    last_err = None
+def fetch_feed(url, headers=None, tries=3, timeout=20):
+    """
+    GET a feed -> (status, content, response_headers); status is None if every
+    try raised. 200/304 return at once; so do 4xx and anything carrying
+    Retry-After, which the scheduler honors on the next run instead of
+    retrying here.
+    """
+    last_err, resp = None, None
     for i in range(tries):
         try:
-            r = session.get(url, timeout=timeout)
-            if r.status_code == 200:
-                return r.content
+            r = session.get(url, headers=headers, timeout=timeout)
+            resp = r
+            if r.status_code in (200, 304):
+                return r.status_code, r.content, r.headers
             last_err = f"HTTP {r.status_code}"
+            if r.status_code < 500 or "Retry-After" in r.headers:
+                break
         except Exception as e:
             last_err = str(e)
         time.sleep(1 + i)  # backoff
     log(f"⚠️ Could not fetch {url}: {last_err}")
-    return None
+    if resp is None:
+        return None, None, {}
+    return resp.status_code, None, resp.headers
+
+def load_feed_states():
+    """
+    feed_url -> state row, or None if feed_state can't be read. In that case
+    the run polls everything and saves nothing, so a transient error can't
+    overwrite the learned state with fresh defaults.
+    """
+    try:
+        r = session.get(f"{FEED_STATE_ENDPOINT}?select=*", headers=HEADERS_DB, timeout=30)
+        r.raise_for_status()
+        return {row["feed_url"]: row for row in r.json()}
+    except Exception as e:
+        log(f"ℹ️ No feed_state available ({e}); polling all feeds, not saving state.")
+        return None
+
+def save_feed_states(states):
+    if not states: return
+    r = session.post(FEED_STATE_ENDPOINT, headers=HEADERS_DB, data=json.dumps(states), timeout=30)
+    if r.status_code not in (201, 200, 204):
+        log(f"⚠️ Saving feed_state failed {r.status_code}: {r.text[:300]}")
 
 def put_article(item, source):
     url = item.get("link") or item.get("id")
@@ -87,24 +125,53 @@ def put_article(item, source):
 
 def main():
     log(f"SUPABASE_URL endpoint: {ARTICLES_ENDPOINT}")
-    total, errors = 0, 0
+    states = load_feed_states() if FEED_SCHEDULE == "adaptive" else None
+    adaptive = states is not None
+    states = states or {}
+    updated = []
+    total, errors, skipped = 0, 0, 0
     for feed in FEEDS:
+        state = states.get(feed) or scheduler.new_state(feed)
+        now = datetime.now(timezone.utc)
+        if adaptive and not scheduler.is_due(state, now):
+            skipped += 1
+            continue
         log(f"Fetching: {feed}")
-        raw = fetch_feed_bytes(feed)
+        status, raw, resp_headers = fetch_feed(feed, headers=scheduler.conditional_headers(state))
+        now = datetime.now(timezone.utc)
+        if status == 304:
+            log("  Not modified")
+            updated.append(scheduler.record_success(state, now, headers=resp_headers, status=304))
+            continue
         if not raw:
             errors += 1
+            updated.append(scheduler.record_failure(state, now, headers=resp_headers, status=status))
             continue
-        f = feedparser.parse(raw)
-        log(f"  Entries: {len(f.entries)}")
-        for entry in f.entries[:30]:
+        since = scheduler.last_item_at(state) if adaptive else None
+        entries, parser = parse_entries(raw, limit=MAX_ENTRIES, mode=FEED_PARSER, since=since)
+        log(f"  New entries: {len(entries)} ({parser})")
+        stored = True
+        for entry in entries:
+            if not (entry.get("link") or entry.get("id")):
+                continue  # nothing to store; not worth re-reading either
             try:
-                total += put_article(entry, source=feed)
+                n = put_article(entry, source=feed)
             except Exception as e:
-                errors += 1
+                n = 0
                 log(f"⚠️ Exception during insert: {e}")
+            if not n:
+                errors += 1
+                stored = False
+            total += n
+        # a failed insert keeps the cutoff where it was so the entry is retried next poll
+        state = scheduler.record_success(state, now, entries, headers=resp_headers, status=status, stored=stored)
+        log(f"  ~{state['items_per_hour']:.2f} items/h; next poll in {state['interval_s'] // 60} min")
+        updated.append(state)
         # small jitter to be polite
         time.sleep(random.uniform(0.5, 1.0))
-    log(f"Inserted_or_merged: {total}; errors: {errors}")
+    if adaptive:
+        save_feed_states(updated)
+    log(f"Inserted_or_merged: {total}; errors: {errors}; not due: {skipped}")
     sys.exit(0)
 
 if __name__ == "__main__":
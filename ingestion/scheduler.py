@@ -0,0 +1,197 @@
+"""
+Adaptive per-feed polling.
+
+The ingest workflow still wakes up every 5 minutes, but each feed is only
+fetched when it is due. Every feed keeps a small state row that records how
+fast it publishes and how often it fails:
+
+  - publication rate: EMA of new items per hour; the poll interval aims for
+    about TARGET_ITEMS_PER_POLL new items per fetch, clamped to
+    [MIN_INTERVAL, MAX_INTERVAL]
+  - errors: EMA error rate stretches the interval; consecutive failures back
+    off exponentially and open a circuit breaker after BREAKER_THRESHOLD
+  - server hints: Retry-After, Cache-Control max-age and ETag/Last-Modified
+    (sent back as conditional request headers; a 304 is a cheap success)
+
+State lives in a Supabase table so it survives between Actions runs:
+
+    create table feed_state (
+      feed_url text primary key,
+      next_poll_at timestamptz,
+      last_polled_at timestamptz,
+      last_item_at timestamptz,
+      interval_s integer,
+      items_per_hour double precision default 0,
+      error_rate double precision default 0,
+      consecutive_failures integer default 0,
+      circuit_open_until timestamptz,
+      etag text,
+      last_modified text,
+      last_status integer
+    );
+    -- only the ingest job (service key, which bypasses RLS) may read or write it
+    alter table feed_state enable row level security;
+
+Everything here is pure (state dict in, state dict out) so the policy can be
+exercised without network access.
+"""
+import calendar, random, re
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+
+MIN_INTERVAL = timedelta(minutes=5)    # the cron tick; can't poll faster than this
+MAX_INTERVAL = timedelta(hours=6)
+DEFAULT_INTERVAL = timedelta(minutes=15)
+DUE_SLACK = timedelta(seconds=60)      # cron start times drift a little
+TARGET_ITEMS_PER_POLL = 1.0
+RATE_ALPHA = 0.3                       # EMA weight of the newest observation
+ERROR_ALPHA = 0.2
+BREAKER_THRESHOLD = 5                  # consecutive failures before the breaker opens
+BREAKER_COOLDOWN = timedelta(hours=2)
+
+def _parse_ts(value):
+    if not value: return None
+    if isinstance(value, datetime): return value
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+def _iso(dt):
+    return dt.isoformat() if dt else None
+
+def new_state(feed_url):
+    return {
+        "feed_url": feed_url,
+        "next_poll_at": None,
+        "last_polled_at": None,
+        "last_item_at": None,
+        "interval_s": int(DEFAULT_INTERVAL.total_seconds()),
+        "items_per_hour": 0.0,
+        "error_rate": 0.0,
+        "consecutive_failures": 0,
+        "circuit_open_until": None,
+        "etag": None,
+        "last_modified": None,
+        "last_status": None,
+    }
+
+def is_due(state, now):
+    open_until = _parse_ts(state.get("circuit_open_until"))
+    if open_until and now + DUE_SLACK < open_until:
+        return False
+    nxt = _parse_ts(state.get("next_poll_at"))
+    return nxt is None or nxt <= now + DUE_SLACK
+
+def last_item_at(state):
+    """Newest entry time seen so far (aware datetime), or None before the first poll."""
+    return _parse_ts(state.get("last_item_at"))
+
+def conditional_headers(state):
+    h = {}
+    if state.get("etag"): h["If-None-Match"] = state["etag"]
+    if state.get("last_modified"): h["If-Modified-Since"] = state["last_modified"]
+    return h
+
+def retry_after(headers, now):
+    """Retry-After as either delta-seconds or an HTTP date -> timedelta (or None)."""
+    value = (headers or {}).get("Retry-After")
+    if not value: return None
+    value = value.strip()
+    if value.isdigit():
+        return timedelta(seconds=int(value))
+    try:
+        return max(parsedate_to_datetime(value) - now, timedelta(0))
+    except (TypeError, ValueError):
+        return None
+
+def max_age(headers):
+    cc = (headers or {}).get("Cache-Control") or ""
+    if "no-cache" in cc or "no-store" in cc:
+        return None
+    m = re.search(r"max-age=(\d+)", cc)
+    return timedelta(seconds=int(m.group(1))) if m else None
+
+def entry_times(entries):
+    """Published (or updated) times of parsed entries as aware datetimes."""
+    out = []
+    for e in entries:
+        st = e.get("published_parsed") or e.get("updated_parsed")
+        if st:
+            out.append(datetime.fromtimestamp(calendar.timegm(st), tz=timezone.utc))
+    return out
+
+def _observed_rate(state, times, now):
+    """New items per hour since the last poll, or from the feed's own span on first sight."""
+    last_item = _parse_ts(state.get("last_item_at"))
+    last_poll = _parse_ts(state.get("last_polled_at"))
+    if last_item and last_poll:
+        hours = max((now - last_poll).total_seconds() / 3600, 1e-3)
+        return sum(1 for t in times if t > last_item) / hours
+    if len(times) >= 2:
+        hours = max((max(times) - min(times)).total_seconds() / 3600, 1e-3)
+        return (len(times) - 1) / hours
+    return None
+
+def _interval(items_per_hour, error_rate):
+    if items_per_hour > 0:
+        iv = timedelta(hours=TARGET_ITEMS_PER_POLL / items_per_hour)
+    else:
+        iv = MAX_INTERVAL
+    iv *= 1 + 2 * error_rate
+    return min(max(iv, MIN_INTERVAL), MAX_INTERVAL)
+
+def record_success(state, now, entries=(), headers=None, status=200, stored=True):
+    """
+    Update state after a 200 or 304. `entries` are the parsed entries (empty
+    on 304). stored=False means some of them could not be written: the
+    last_item_at cutoff and the validators then stay put, so the next poll
+    fetches and offers those entries again.
+    """
+    s = dict(state)
+    times = entry_times(entries)
+    obs = _observed_rate(s, times, now) if status != 304 else 0.0
+    if obs is not None:
+        prev = s.get("items_per_hour") or 0.0
+        s["items_per_hour"] = obs if s.get("last_polled_at") is None else (1 - RATE_ALPHA) * prev + RATE_ALPHA * obs
+    s["error_rate"] = (1 - ERROR_ALPHA) * (s.get("error_rate") or 0.0)
+    s["consecutive_failures"] = 0
+    s["circuit_open_until"] = None
+    s["last_status"] = status
+
+    if times and stored:
+        newest = max(times)
+        last_item = _parse_ts(s.get("last_item_at"))
+        if last_item is None or newest > last_item:
+            s["last_item_at"] = _iso(newest)
+    headers = headers or {}
+    if status != 304 and stored:
+        s["etag"] = headers.get("ETag")
+        s["last_modified"] = headers.get("Last-Modified")
+
+    iv = _interval(s["items_per_hour"], s["error_rate"])
+    hint = max_age(headers)
+    if hint and hint > iv:
+        iv = min(hint, MAX_INTERVAL)
+    s["interval_s"] = int(iv.total_seconds())
+    s["last_polled_at"] = _iso(now)
+    s["next_poll_at"] = _iso(now + iv)
+    return s
+
+def record_failure(state, now, headers=None, status=None):
+    """Update state after an HTTP error or exception; status is None for network errors."""
+    s = dict(state)
+    fails = (s.get("consecutive_failures") or 0) + 1
+    s["consecutive_failures"] = fails
+    s["error_rate"] = (1 - ERROR_ALPHA) * (s.get("error_rate") or 0.0) + ERROR_ALPHA
+    s["last_status"] = status
+
+    base = timedelta(seconds=s.get("interval_s") or DEFAULT_INTERVAL.total_seconds())
+    wait = min(base * (2 ** (fails - 1)), MAX_INTERVAL)
+    wait *= random.uniform(0.9, 1.1)
+    if fails >= BREAKER_THRESHOLD:
+        wait = max(wait, BREAKER_COOLDOWN)
+        s["circuit_open_until"] = _iso(now + wait)
+    ra = retry_after(headers, now)
+    if ra and ra > wait:
+        wait = ra
+    # last_polled_at stays at the last success so the next rate estimate spans the gap
+    s["next_poll_at"] = _iso(now + wait)
+    return s
@@ -1,6 +1,9 @@
 import os, sys, json, time
 from datetime import datetime, timedelta, timezone
 import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from grmm import workqueue
 # ---------- utils ----------
 def log(x: str) -> None:
     print(x, flush=True)
@@ -113,6 +116,17 @@ def fetch_events_to_score(limit: int = 100):
     r.raise_for_status()
     return r.json()
 
+def fetch_events_by_id(ids):
+    """Same fields as fetch_events_to_score, for ids claimed from the work queue."""
+    url = (
+        f"{EVENTS}"
+        "?select=event_id,extracted,created_at,sentiment,confidence"
+        f"&event_id=in.({','.join(str(i) for i in ids)})"
+    )
+    r = requests.get(url, headers=HEADERS, timeout=30)
+    r.raise_for_status()
+    return r.json()
+
 def update_event_sentiment(event_id: int, sentiment: float, confidence: float, details: dict | None):
     """
     PATCH event row with sentiment + confidence.
@@ -132,28 +146,74 @@ def update_event_sentiment(event_id: int, sentiment: float, confidence: float, d
 
 
 # ---------- driver ----------
+def score_event(ev) -> bool:
+    """Score one event row and PATCH it back; False if it has no headline to score."""
+    # headline lives inside extracted JSON
+    extracted = ev.get("extracted") or {}
+    headline = (extracted.get("headline") or "").strip()
+    if not headline:
+        return False
+
+    if finbert:
+        all_scores = finbert(headline)
+        score, conf, detail = map_finbert_scores(all_scores)
+    else:
+        score, conf, detail = map_vader_scores(headline)
+
+    update_event_sentiment(ev["event_id"], score, conf, detail)
+    return True
+
+def process_queue(queue):
+    """
+    Work-queue mode: score exactly the events queued for this stage.
+    Rows already scored (e.g. by a window run) are skipped, not re-scored.
+    Scoring an event queues its signals (events_to_signals trigger); events
+    that can't be scored are handed to signals here, to get neutral signals.
+    """
+    scored = 0
+    def to_signals(ids):
+        queue.enqueue("signals", ids)
+    def handle(ids):
+        nonlocal scored
+        try:
+            evs = fetch_events_by_id(ids)
+        except Exception as e:
+            log(f"⚠️ Failed to fetch events {ids[0]}..{ids[-1]}: {e}")
+            return ids
+        failed, unscorable = [], []
+        for ev in evs:
+            if ev.get("sentiment") is not None:
+                continue
+            try:
+                if score_event(ev):
+                    scored += 1
+                else:
+                    unscorable.append(ev["event_id"])
+            except Exception as e:
+                failed.append(ev["event_id"])
+                log(f"⚠️ Failed on event {ev.get('event_id')}: {e}")
+        try:
+            to_signals(unscorable)
+        except Exception as e:
+            log(f"⚠️ Failed to queue signals for unscorable events: {e}")
+            failed.extend(unscorable)
+        return failed
+    done, errs = workqueue.drain(queue, "sentiment", handle, batch=200, log=log, give_up=to_signals,
+                                 follow=float(os.environ.get("WORK_QUEUE_FOLLOW", 0)))
+    log(f"Updated sentiment for {scored} events; errors: {errs}")
+
 def process_batch():
+    queue = workqueue.from_env(SUPABASE_URL, HEADERS)
+    if queue:
+        return process_queue(queue)
+
     rows = fetch_events_to_score(limit=200)
     log(f"Found {len(rows)} events needing sentiment")
 
     done, errs = 0, 0
     for ev in rows:
         try:
-            # headline lives inside extracted JSON
-            extracted = ev.get("extracted") or {}
-            headline = (extracted.get("headline") or "").strip()
-            if not headline:
-                continue
-
-            if finbert:
-                all_scores = finbert(headline)
-                score, conf, detail = map_finbert_scores(all_scores)
-            else:
-                score, conf, detail = map_vader_scores(headline)
-
-            update_event_sentiment(ev["event_id"], score, conf, detail)
-            done += 1
-
+            done += score_event(ev)
         except Exception as e:
             errs += 1
             log(f"⚠️ Failed on event {ev.get('event_id')}: {e}")
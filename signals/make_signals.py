@@ -1,5 +1,10 @@
 import os, sys, json, requests
 from datetime import datetime, timedelta, timezone
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from grmm import workqueue
+from grmm.peers import PeerGraph
 
 def log(x): print(x, flush=True)
 
@@ -15,10 +20,24 @@ JSON_HEADERS = {**HEADERS, "Content-Type":"application/json"}
 EVENTS   = f"{SUPABASE_URL}/rest/v1/events"
 SIGNALS  = f"{SUPABASE_URL}/rest/v1/signals"
 
-# toy priors for CEO_CHANGE events
-PRIORS = {
-    "CEO_CHANGE": {"1D": -0.01, "5D": -0.004, "20D": 0.0}
-}
+# Fan-out: every event writes signals for its primary ticker, the other
+# tickers it names (affected_tickers) and sector peers of the primary, each
+# with a sector-ETF hedge. Priors come from the reference-data snapshot, by
+# the primary ticker's sector. The leg columns need, on the signals table:
+#   alter table signals add column role text, add column hedge_ticker text,
+#                       add column hedge_ratio double precision,
+#                       add column refdata_version text;
+# Until that has run, rows are written without them (see post_signals).
+ALPHA = 0.75          # sentiment sensitivity (tune later)
+CLAMP = 0.05          # safety clamp ±5% to avoid crazy values
+UNCERTAINTY = 0.02    # for the primary leg; spillover legs get up to 2x
+LEG_WEIGHT = {"primary": 1.0, "affected": 0.5, "peer": 0.25}
+MAX_PEERS = 25
+BULK_CHUNK = 1000     # rows per POST
+LEG_COLUMNS = ("role", "hedge_ticker", "hedge_ratio", "refdata_version")
+legacy_schema = False  # set once PostgREST reports the leg columns missing
+
+graph = PeerGraph.from_price_cache()
 
 def recent_events(hours=12, limit=200):
     url = f"{EVENTS}?select=*&order=created_at.desc&limit={limit}"
@@ -32,48 +51,171 @@ def recent_events(hours=12, limit=200):
             out.append(ev)
     return out
 
-def already_have_signal(event_id):
-    url = f"{SIGNALS}?select=signal_id&event_id=eq.{event_id}&limit=1"
+def events_by_id(ids):
+    url = f"{EVENTS}?select=*&event_id=in.({','.join(str(i) for i in ids)})"
     r = requests.get(url, headers=HEADERS, timeout=30); r.raise_for_status()
-    return len(r.json()) > 0
+    return r.json()
+
+def events_with_signals(ids):
+    """Subset of event ids that already have signals (one request per chunk)."""
+    have = set()
+    ids = list(ids)
+    for i in range(0, len(ids), 200):
+        chunk = ",".join(str(x) for x in ids[i:i+200])
+        url = f"{SIGNALS}?select=event_id&event_id=in.({chunk})"
+        r = requests.get(url, headers=HEADERS, timeout=30); r.raise_for_status()
+        have.update(row["event_id"] for row in r.json())
+    return have
+
+def priors_for(ev):
+    """Base return per horizon for the event's type and its primary ticker's sector."""
+    return graph.ref.priors(ev["event_type"], graph.sector_of(ev.get("primary_ticker")))
 
-def insert_signals(ev, priors):
-    # scale the prior by sentiment in [-1,+1]
-    alpha = 0.75  # sensitivity (tune later)
-    s = ev.get("sentiment")
-    scale = (1 + alpha * s) if s is not None else 1.0
+def legs_for(ev):
+    """[(ticker, role)] an event fans out to, primary first, no duplicates."""
+    primary = ev.get("primary_ticker")
+    legs, seen = [(primary, "primary")], {primary}
+    for t in ev.get("affected_tickers") or []:
+        if t not in seen:
+            legs.append((t, "affected")); seen.add(t)
+    if primary:
+        for t in graph.peers_of(primary)[:MAX_PEERS]:
+            if t not in seen:
+                legs.append((t, "peer")); seen.add(t)
+    return legs
+
+def fan_out(evs):
+    """
+    Signal rows for all (event, leg, horizon) combinations in one numpy pass.
+    Each leg's prior is scaled by the event's sentiment and by its leg weight.
+    """
+    if not evs: return []
+    base = [priors_for(ev) for ev in evs]
+    horizons = list(dict.fromkeys(h for p in base for h in p))
+    prior = np.array([[p.get(h, np.nan) for h in horizons] for p in base])
+    sent = np.array([ev.get("sentiment") if ev.get("sentiment") is not None else 0.0 for ev in evs], dtype=float)
+
+    ev_idx, tickers, roles = [], [], []
+    for i, ev in enumerate(evs):
+        for t, role in legs_for(ev):
+            ev_idx.append(i); tickers.append(t); roles.append(role)
+    ev_idx = np.array(ev_idx)
+    w = np.array([LEG_WEIGHT[r] for r in roles])
+
+    pred = np.clip(prior[ev_idx] * ((1 + ALPHA * sent[ev_idx]) * w)[:, None], -CLAMP, CLAMP)
+    unc = UNCERTAINTY * (2 - w)
+    hedges = [graph.hedge(t) for t in tickers]
 
     rows = []
-    for horizon, base_pred in priors.items():
-        adj = base_pred * scale
-        # safety clamp ±5% to avoid crazy values
-        adj = max(min(adj, 0.05), -0.05)
+    for leg, hj in zip(*np.nonzero(~np.isnan(pred))):
+        adj = float(pred[leg, hj])
+        hedge_ticker, hedge_ratio = hedges[leg]
         rows.append({
-            "event_id": ev["event_id"],
-            "ticker": ev.get("primary_ticker"),
-            "horizon": horizon,
+            "event_id": evs[ev_idx[leg]]["event_id"],
+            "ticker": tickers[leg],
+            "horizon": horizons[hj],
             "predicted_return": adj,
-            "uncertainty": 0.02,
-            "direction": 1 if adj > 0 else -1 if adj < 0 else 0
+            "uncertainty": float(unc[leg]),
+            "direction": 1 if adj > 0 else -1 if adj < 0 else 0,
+            "role": roles[leg],
+            "hedge_ticker": hedge_ticker,
+            "hedge_ratio": round(hedge_ratio, 4),
+            "refdata_version": graph.version,
         })
+    return rows
+
+def missing_leg_column(r):
+    """True if PostgREST rejected the POST because a leg column doesn't exist yet."""
+    return r.status_code == 400 and any(f"'{c}'" in r.text for c in LEG_COLUMNS)
 
-    r = requests.post(SIGNALS, headers=JSON_HEADERS, data=json.dumps(rows), timeout=30)
-    if r.status_code not in (200,201,204,409):
+def post_signals(rows, conflict_ok=False):
+    """
+    POST signal rows. A 409 rejects the whole POST, so it only counts as
+    success with conflict_ok (a single event's rows that are already there).
+    """
+    global legacy_schema
+    if legacy_schema:
+        rows = [{k: v for k, v in row.items() if k not in LEG_COLUMNS} for row in rows]
+    r = requests.post(SIGNALS, headers=JSON_HEADERS, data=json.dumps(rows), timeout=60)
+    if not legacy_schema and missing_leg_column(r):
+        log("ℹ️ signals has no leg columns yet; writing without role/hedge (run the ALTER in make_signals.py)")
+        legacy_schema = True
+        return post_signals(rows, conflict_ok)
+    ok = (200, 201, 204, 409) if conflict_ok else (200, 201, 204)
+    if r.status_code not in ok:
         raise RuntimeError(f"Insert signals failed {r.status_code}: {r.text[:200]}")
 
+def insert_signal_rows(rows):
+    """
+    POST rows in ~BULK_CHUNK batches; an event's rows never straddle two
+    batches. If a batch fails (a 409 on any row included), its events are
+    retried one POST each so a bad row only sinks its own event; there a 409
+    means the event's signals are already stored. Returns the set of event
+    ids that failed.
+    """
+    failed, chunk = set(), []
+    for i, row in enumerate(rows):
+        chunk.append(row)
+        last = i + 1 == len(rows)
+        if last or (len(chunk) >= BULK_CHUNK and rows[i + 1]["event_id"] != row["event_id"]):
+            try:
+                post_signals(chunk)
+            except Exception as ex:
+                log(f"⚠️ Bulk insert of {len(chunk)} rows failed ({ex}); retrying per event")
+                by_event = {}
+                for r in chunk:
+                    by_event.setdefault(r["event_id"], []).append(r)
+                for eid, ev_rows in by_event.items():
+                    try:
+                        post_signals(ev_rows, conflict_ok=True)
+                    except Exception as ex:
+                        failed.add(eid)
+                        log(f"⚠️ Failed on event {eid}: {ex}")
+            chunk = []
+    return failed
+
+
+def handle_events(evs):
+    """
+    Fan out and bulk-write signals for events with priors and no signals yet.
+    Returns (events made, ids of events whose signals could not be written).
+    """
+    evs = [e for e in evs if priors_for(e)]
+    if not evs: return 0, set()
+    have = events_with_signals(e["event_id"] for e in evs)
+    evs = [e for e in evs if e["event_id"] not in have]
+    rows = fan_out(evs)
+    failed = insert_signal_rows(rows)
+    log(f"  {len(evs)} events -> {len(rows)} signal rows ({len(failed)} events failed)")
+    return len(evs) - len(failed), failed
+
+def process_queue(queue):
+    made = 0
+    def handle(ids):
+        nonlocal made
+        try:
+            n, failed = handle_events(events_by_id(ids))
+        except Exception as ex:
+            # couldn't even read the batch (events/signals lookup); retry it all
+            log(f"⚠️ Failed on events {ids[0]}..{ids[-1]}: {ex}")
+            return ids
+        made += n
+        return list(failed)
+    done, failed = workqueue.drain(queue, "signals", handle, batch=200, log=log,
+                                   follow=float(os.environ.get("WORK_QUEUE_FOLLOW", 0)))
+    log(f"Processed {done} queued events ({failed} failed); created signals: {made}")
 
 def process():
+    queue = workqueue.from_env(SUPABASE_URL, HEADERS)
+    if queue:
+        return process_queue(queue)
     evs = recent_events()
     log(f"Fetched {len(evs)} recent events")
     made = 0
-    for e in evs:
-        if already_have_signal(e["event_id"]): continue
-        if e["event_type"] in PRIORS:
-            try:
-                insert_signals(e, PRIORS[e["event_type"]])
-                made += 1
-            except Exception as ex:
-                log(f"⚠️ Failed on event {e['event_id']}: {ex}")
+    try:
+        made, _ = handle_events(evs)
+    except Exception as ex:
+        log(f"⚠️ Failed to create signals: {ex}")
     log(f"Created signals: {made}")
 
 if __name__ == "__main__":
@@ -0,0 +1,4 @@
+import os, sys
+
+# the jobs run as plain scripts; put the repo root on sys.path like they do
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,132 @@
+import calendar
+from datetime import datetime, timezone
+
+import pytest
+
+from ingestion.feedstream import SEEN_RUN, FeedParseError, iter_entries, parse_entries, take_new
+
+RSS2 = b"""<?xml version="1.0"?>
+<rss version="2.0"><channel>
+  <title>Channel</title><link>https://example.com/</link>
+  <item>
+    <title>First</title><link>https://example.com/1</link>
+    <description>One</description><guid>urn:1</guid>
+    <pubDate>Thu, 01 Jan 2026 12:00:00 GMT</pubDate>
+  </item>
+  <item>
+    <title>Second</title><guid>https://example.com/2</guid>
+    <pubDate>Thu, 01 Jan 2026 11:00:00 +0100</pubDate>
+  </item>
+</channel></rss>"""
+
+RSS1 = b"""<?xml version="1.0"?>
+<rdf:RDF xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#"
+         xmlns="http://purl.org/rss/1.0/" xmlns:dc="http://purl.org/dc/elements/1.1/">
+  <channel rdf:about="https://example.com/"><title>Channel</title></channel>
+  <item rdf:about="https://example.com/1">
+    <title>First</title><link>https://example.com/1</link>
+    <description>One</description><dc:date>2026-01-01T12:00:00Z</dc:date>
+  </item>
+</rdf:RDF>"""
+
+ATOM = b"""<?xml version="1.0"?>
+<feed xmlns="http://www.w3.org/2005/Atom">
+  <title>Feed</title><link rel="self" href="https://example.com/feed"/>
+  <entry>
+    <title>First</title>
+    <link rel="self" href="https://example.com/1.atom"/>
+    <link href="https://example.com/1"/>
+    <id>urn:1</id>
+    <updated>2026-01-01T12:00:00+02:00</updated>
+    <content type="xhtml"><div xmlns="http://www.w3.org/1999/xhtml"><p>Hello <b>world</b></p></div></content>
+  </entry>
+  <entry>
+    <title>Second</title>
+    <link rel="alternate" href="https://example.com/2"/>
+    <summary>Short</summary>
+    <published>2026-01-01T09:00:00Z</published>
+  </entry>
+</feed>"""
+
+
+def ts(st):
+    return datetime.fromtimestamp(calendar.timegm(st), tz=timezone.utc)
+
+def dated(*hours):
+    return [{"published_parsed": datetime(2026, 1, 1, h, tzinfo=timezone.utc).timetuple(), "n": h} for h in hours]
+
+
+def test_rss2_entries():
+    first, second = iter_entries(RSS2)
+    assert first["title"] == "First"
+    assert first["link"] == "https://example.com/1"
+    assert first["id"] == "urn:1"
+    assert first["summary"] == "One"
+    assert ts(first["published_parsed"]) == datetime(2026, 1, 1, 12, tzinfo=timezone.utc)
+    assert second["link"] == "https://example.com/2"     # from an http guid
+    assert ts(second["published_parsed"]) == datetime(2026, 1, 1, 10, tzinfo=timezone.utc)
+
+def test_rss1_entries():
+    (entry,) = iter_entries(RSS1)
+    assert (entry["title"], entry["link"], entry["summary"]) == ("First", "https://example.com/1", "One")
+    assert ts(entry["published_parsed"]) == datetime(2026, 1, 1, 12, tzinfo=timezone.utc)
+
+def test_atom_entries():
+    first, second = iter_entries(ATOM)
+    assert first["link"] == "https://example.com/1"      # not the rel="self" link
+    assert first["summary"] == "Hello world"             # text of the xhtml content
+    assert first["published_parsed"] is None
+    assert ts(first["updated_parsed"]) == datetime(2026, 1, 1, 10, tzinfo=timezone.utc)
+    assert (second["link"], second["summary"]) == ("https://example.com/2", "Short")
+
+def test_limit_stops_reading():
+    assert [e["title"] for e in iter_entries(RSS2, limit=1)] == ["First"]
+    assert list(iter_entries(RSS2, limit=0)) == []
+
+def test_malformed_xml_raises():
+    with pytest.raises(FeedParseError):
+        list(iter_entries(b"<rss><channel><item></channel>"))
+
+
+def test_take_new_keeps_entries_at_or_after_since():
+    since = datetime(2026, 1, 1, 10, tzinfo=timezone.utc)
+    new, scanned = take_new(dated(12, 11, 10, 9), since=since)
+    assert [e["n"] for e in new] == [12, 11, 10]
+    assert scanned == 4
+
+def test_take_new_treats_undated_entries_as_new():
+    since = datetime(2026, 1, 1, 10, tzinfo=timezone.utc)
+    new, _ = take_new([{"n": "undated"}] + dated(9), since=since)
+    assert [e["n"] for e in new] == ["undated"]
+
+def test_take_new_stops_after_a_run_of_seen_entries():
+    since = datetime(2026, 1, 1, 12, tzinfo=timezone.utc)
+    old = dated(*range(11, 11 - SEEN_RUN, -1))
+    new, scanned = take_new(dated(13) + old + dated(14), since=since)
+    assert [e["n"] for e in new] == [13]
+    assert scanned == 1 + SEEN_RUN
+
+def test_take_new_limit():
+    new, scanned = take_new(dated(12, 11, 10), limit=2)
+    assert len(new) == 2 and scanned == 2
+
+
+def test_parse_entries_streams_well_formed_feeds():
+    entries, parser = parse_entries(ATOM)
+    assert parser == "stream" and len(entries) == 2
+
+def test_parse_entries_with_nothing_new_does_not_fall_back():
+    entries, parser = parse_entries(RSS2, since=datetime(2026, 1, 2, tzinfo=timezone.utc))
+    assert (entries, parser) == ([], "stream")
+
+@pytest.mark.parametrize("raw", [
+    b"this is not a feed",
+    RSS2.replace(b"<description>One</description>", b"<description>One&nbsp;two</description>"),
+])
+def test_parse_entries_falls_back_to_feedparser(raw):
+    pytest.importorskip("feedparser")
+    entries, parser = parse_entries(raw)
+    assert parser == "feedparser"
+    if b"&nbsp;" in raw:
+        assert [e["title"] for e in entries] == ["First", "Second"]
+        assert entries[0]["summary"] == "One\xa0two"
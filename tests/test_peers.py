@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+
+from grmm.peers import BETA_CLAMP, MARKET_ETF, MIN_OBS, PeerGraph, estimate_betas
+from grmm.refdata import Snapshot, build
+
+SOURCE = {
+    "sectors": [{"name": "Financials", "etf": "XLF", "beta": 1.1}],
+    "securities": [
+        {"ticker": "JPM", "sector": "Financials", "aliases": ["JPMorgan"]},
+        {"ticker": "GS", "sector": "Financials", "beta": 1.3, "aliases": ["Goldman"]},
+        {"ticker": "XLF", "sector": "Financials", "aliases": []},
+        {"ticker": "ZZZ", "sector": "Unlisted", "aliases": []},
+    ],
+    "priors": [{"event_type": "CEO_CHANGE", "sector": "*", "1D": -0.01}],
+}
+
+
+@pytest.fixture
+def snap(tmp_path):
+    path = tmp_path / "snapshot.bin"
+    path.write_bytes(build(SOURCE))
+    return Snapshot(str(path))
+
+def prices(returns):
+    return 100 * np.exp(np.concatenate([[0.0], np.cumsum(returns)]))
+
+
+def test_estimate_betas_recovers_the_slope():
+    rng = np.random.default_rng(0)
+    rb = rng.normal(0, 0.01, 250)
+    closes = {"XLF": prices(rb), "JPM": prices(1.5 * rb + rng.normal(0, 0.002, 250))}
+    assert estimate_betas(closes, [("JPM", "XLF")])["JPM"] == pytest.approx(1.5, abs=0.05)
+
+def test_estimate_betas_drops_missing_days_and_short_histories():
+    rng = np.random.default_rng(1)
+    rb = rng.normal(0, 0.01, MIN_OBS + 10)
+    a, b = prices(2 * rb), prices(rb)
+    a[5] = np.nan                         # costs the two returns around it
+    closes = {"A": a, "B": b, "SHORT": prices(rb[:MIN_OBS - 1]), "B2": prices(rb[:MIN_OBS - 1])}
+    betas = estimate_betas(closes, [("A", "B"), ("SHORT", "B2"), ("A", "MISSING"), ("SHORT", "B")])
+    assert betas == {"A": pytest.approx(2.0)}
+
+    closes["A"] = prices(10 * rb)
+    assert estimate_betas(closes, [("A", "B")])["A"] == BETA_CLAMP[1]
+
+
+def test_beta_falls_back_from_estimate_to_security_to_sector(snap):
+    g = PeerGraph(snap, betas={"JPM": 0.8, "GS": 0.9})
+    assert g.beta("JPM") == 0.8            # estimated
+    assert g.beta("GS") == 0.9             # estimate beats the snapshot's 1.3
+    g = PeerGraph(snap)
+    assert g.beta("GS") == 1.3             # security beta
+    assert g.beta("JPM") == 1.1            # sector default
+    assert g.beta("NOPE") == 1.0           # unknown ticker, unknown sector
+
+def test_hedge(snap):
+    g = PeerGraph(snap, betas={"JPM": 0.8})
+    assert g.hedge("JPM") == ("XLF", 0.8)
+    assert g.hedge("ZZZ") == (MARKET_ETF, 1.0)   # sector without an ETF
+    assert g.hedge("NOPE") == (MARKET_ETF, 1.0)
+    assert g.hedge("XLF") == (None, 0.0)         # the hedge itself
+    assert g.hedge(None) == (None, 0.0)
+
+def test_peers_exclude_the_ticker(snap):
+    g = PeerGraph(snap)
+    assert g.peers_of("JPM") == ["GS", "XLF"]
+    assert g.peers_of("NOPE") == []
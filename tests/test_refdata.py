@@ -0,0 +1,116 @@
+import json, os, pickle, random
+
+import pytest
+
+from grmm import refdata
+from grmm.refdata import AliasMatcher, Snapshot, SnapshotError, build, load_matcher, source_version
+
+SOURCE = {
+    "sectors": [
+        {"name": "Financials", "etf": "XLF", "beta": 1.1},
+        {"name": "Energy", "etf": "XLE", "beta": 0.9},
+    ],
+    "securities": [
+        {"ticker": "JPM", "name": "JPMorgan Chase", "sector": "Financials", "aliases": ["JPMorgan", "JPM"]},
+        {"ticker": "GS", "name": "Goldman Sachs", "sector": "Financials", "beta": 1.3, "aliases": ["Goldman"]},
+        {"ticker": "XOM", "name": "Exxon Mobil", "sector": "Energy", "aliases": ["Exxon", "Morgan"]},
+        {"ticker": "ZZZ", "sector": "Unlisted", "aliases": ["jpmorgan"]},
+    ],
+    "priors": [
+        {"event_type": "CEO_CHANGE", "sector": "*", "1D": -0.01, "5D": -0.004},
+        {"event_type": "CEO_CHANGE", "sector": "Financials", "1D": -0.012},
+    ],
+}
+
+
+@pytest.fixture
+def snap(tmp_path):
+    path = tmp_path / "snapshot.bin"
+    path.write_bytes(build(SOURCE))
+    return Snapshot(str(path))
+
+
+def test_round_trip(snap):
+    assert snap.version == source_version(SOURCE)
+    assert snap.tickers() == ["GS", "JPM", "XOM", "ZZZ"]
+    assert snap.security("GS") == {"ticker": "GS", "name": "Goldman Sachs", "sector": "Financials", "beta": 1.3}
+    assert snap.security("JPM")["beta"] is None
+    assert snap.security("NOPE") is None and snap.security(None) is None
+    assert snap.sectors() == [
+        {"name": "Financials", "etf": "XLF", "beta": 1.1},
+        {"name": "Energy", "etf": "XLE", "beta": 0.9},
+        {"name": "Unlisted", "etf": None, "beta": 1.0},   # sectors only named by a security get defaults
+    ]
+    assert snap.members() == {"Financials": ["GS", "JPM"], "Energy": ["XOM"], "Unlisted": ["ZZZ"]}
+
+def test_priors_fall_back_to_any_sector(snap):
+    assert snap.priors("CEO_CHANGE", "Financials") == {"1D": -0.012}
+    assert snap.priors("CEO_CHANGE", "Energy") == {"1D": -0.01, "5D": -0.004}
+    assert snap.priors("CEO_CHANGE", None) == {"1D": -0.01, "5D": -0.004}
+    assert snap.priors("CEO_CHANGE", "Energy", fallback=False) is None
+    assert snap.priors("MERGER", "Financials") is None
+    assert snap.event_types() == ["CEO_CHANGE"]
+
+def test_build_is_deterministic():
+    shuffled = {k: SOURCE[k] for k in reversed(list(SOURCE))}
+    assert build(shuffled) == build(SOURCE)
+
+def test_not_a_snapshot(tmp_path):
+    path = tmp_path / "bogus.bin"
+    path.write_bytes(b"NOPE" + bytes(64))
+    with pytest.raises(SnapshotError):
+        Snapshot(str(path))
+
+def test_committed_snapshot_is_built_from_source():
+    with open(refdata.SOURCE_PATH) as f:
+        src = json.load(f)
+    with open(os.path.join(refdata.HERE, "snapshot.bin"), "rb") as f:
+        committed = f.read()
+    # if this fails, run `python -m grmm.refdata build` and commit snapshot.bin
+    assert Snapshot(os.path.join(refdata.HERE, "snapshot.bin")).version == source_version(src)
+    assert committed == build(src)
+
+
+def test_first_alias_in_source_wins(snap):
+    m = AliasMatcher(snap.aliases())
+    assert m.find_ticker("JPMorgan names a new CEO") == "JPM"   # also contains "Morgan" (XOM)
+    assert m.find_ticker("Morgan and Goldman") == "GS"
+    assert m.find_tickers("Exxon, Goldman and JPMorgan") == ["JPM", "GS", "XOM"]
+    assert m.find_ticker("nothing here") is None
+
+def test_matcher_agrees_with_a_substring_scan():
+    # the loop the matcher replaced: first alias in source order that occurs in the text
+    snap = refdata.load()
+    aliases = [(a, t) for a, t, _ in sorted(snap.aliases(), key=lambda x: x[2])]
+    m = AliasMatcher(snap.aliases())
+    words = [a for a, _ in aliases] + ["the", "ceo", "steps", "down", "x", " "]
+    rng = random.Random(7)
+    for _ in range(2000):
+        text = " ".join(rng.choice(words) for _ in range(rng.randint(0, 6)))
+        text = "".join(c.upper() if rng.random() < 0.3 else c for c in text)
+        expected = next((t for a, t in aliases if a in text.lower()), None)
+        assert m.find_ticker(text) == expected, text
+
+
+def test_load_matcher_reuses_the_pickle(snap, tmp_path, monkeypatch):
+    cache = tmp_path / "cache"
+    first = load_matcher(snap, str(cache))
+    (pkl,) = cache.iterdir()
+    assert snap.version in pkl.name
+
+    def no_build(self, aliases):
+        raise AssertionError("rebuilt instead of loading the pickle")
+    monkeypatch.setattr(AliasMatcher, "__init__", no_build)
+    again = load_matcher(snap, str(cache))
+    assert again is not first
+    assert again.find_ticker("Goldman") == "GS"
+
+def test_load_matcher_rebuilds_a_bad_pickle(snap, tmp_path):
+    cache = tmp_path / "cache"
+    load_matcher(snap, str(cache))
+    (pkl,) = cache.iterdir()
+    pkl.write_bytes(b"not a pickle")
+    m = load_matcher(snap, str(cache))
+    assert m.find_ticker("Goldman") == "GS"
+    with open(pkl, "rb") as f:
+        assert isinstance(pickle.load(f), AliasMatcher)   # rewritten
@@ -0,0 +1,93 @@
+import time
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+from ingestion import scheduler
+from ingestion.scheduler import (BREAKER_COOLDOWN, BREAKER_THRESHOLD, MAX_INTERVAL, MIN_INTERVAL,
+                                 TARGET_ITEMS_PER_POLL)
+
+NOW = datetime(2026, 1, 1, 12, tzinfo=timezone.utc)
+
+
+def entries(*minutes_ago, now=NOW):
+    return [{"published_parsed": time.gmtime((now - timedelta(minutes=m)).timestamp())} for m in minutes_ago]
+
+
+def test_interval_follows_the_publication_rate_within_the_clamp():
+    assert scheduler._interval(2.0, 0.0) == timedelta(hours=TARGET_ITEMS_PER_POLL / 2.0)
+    assert scheduler._interval(1000.0, 0.0) == MIN_INTERVAL
+    assert scheduler._interval(0.01, 0.0) == MAX_INTERVAL
+    assert scheduler._interval(0.0, 0.0) == MAX_INTERVAL
+    assert scheduler._interval(2.0, 0.5) == timedelta(hours=1)   # errors stretch it
+
+def test_first_poll_takes_the_rate_from_the_feeds_own_span():
+    s = scheduler.record_success(scheduler.new_state("f"), NOW, entries(0, 30, 60))
+    assert s["items_per_hour"] == 2.0
+    assert s["interval_s"] == 30 * 60
+    assert s["next_poll_at"] == (NOW + timedelta(minutes=30)).isoformat()
+    assert scheduler.last_item_at(s) == NOW
+
+def test_later_polls_count_only_items_newer_than_the_last_one():
+    s = scheduler.record_success(scheduler.new_state("f"), NOW, entries(0, 30, 60))
+    later = NOW + timedelta(hours=1)
+    s2 = scheduler.record_success(s, later, entries(10, 60, now=later) + entries(0, 30))
+    # one new item in the hour since the last poll; EMA from 2/h
+    assert abs(s2["items_per_hour"] - (0.7 * 2.0 + 0.3 * 1.0)) < 1e-9
+
+def test_failures_back_off_and_open_the_breaker(monkeypatch):
+    monkeypatch.setattr(scheduler.random, "uniform", lambda a, b: 1.0)
+    s = scheduler.new_state("f")
+    base = timedelta(seconds=s["interval_s"])
+    for n in range(1, BREAKER_THRESHOLD):
+        s = scheduler.record_failure(s, NOW, status=503)
+        assert s["next_poll_at"] == (NOW + min(base * 2 ** (n - 1), MAX_INTERVAL)).isoformat()
+        assert s["circuit_open_until"] is None
+    assert scheduler.is_due(s, NOW + MAX_INTERVAL)
+
+    s = scheduler.record_failure(s, NOW, status=503)
+    assert s["consecutive_failures"] == BREAKER_THRESHOLD
+    open_for = max(min(base * 2 ** (BREAKER_THRESHOLD - 1), MAX_INTERVAL), BREAKER_COOLDOWN)
+    assert s["circuit_open_until"] == (NOW + open_for).isoformat()
+    s["next_poll_at"] = None   # the breaker alone must keep it from polling
+    assert not scheduler.is_due(s, NOW + open_for / 2)
+    assert scheduler.is_due(s, NOW + open_for)
+
+    s = scheduler.record_success(s, NOW + open_for)
+    assert s["consecutive_failures"] == 0 and s["circuit_open_until"] is None
+
+def test_retry_after_as_seconds_or_http_date():
+    assert scheduler.retry_after({"Retry-After": "120"}, NOW) == timedelta(seconds=120)
+    when = format_datetime(NOW + timedelta(minutes=10), usegmt=True)
+    assert scheduler.retry_after({"Retry-After": when}, NOW) == timedelta(minutes=10)
+    past = format_datetime(NOW - timedelta(minutes=10), usegmt=True)
+    assert scheduler.retry_after({"Retry-After": past}, NOW) == timedelta(0)
+    assert scheduler.retry_after({"Retry-After": "soon"}, NOW) is None
+    assert scheduler.retry_after({}, NOW) is None
+
+def test_retry_after_outranks_a_shorter_backoff(monkeypatch):
+    monkeypatch.setattr(scheduler.random, "uniform", lambda a, b: 1.0)
+    s = scheduler.record_failure(scheduler.new_state("f"), NOW, {"Retry-After": "7200"}, status=429)
+    assert s["next_poll_at"] == (NOW + timedelta(hours=2)).isoformat()
+
+def test_not_modified_keeps_the_validators():
+    s = scheduler.record_success(scheduler.new_state("f"), NOW, entries(0, 30),
+                                 {"ETag": '"v1"', "Last-Modified": "Thu, 01 Jan 2026 11:00:00 GMT"})
+    assert scheduler.conditional_headers(s) == {"If-None-Match": '"v1"',
+                                                "If-Modified-Since": "Thu, 01 Jan 2026 11:00:00 GMT"}
+    s2 = scheduler.record_success(s, NOW + timedelta(hours=1), status=304)
+    assert (s2["etag"], s2["last_modified"]) == (s["etag"], s["last_modified"])
+    assert s2["items_per_hour"] < s["items_per_hour"]
+
+def test_unstored_entries_keep_the_cutoff_and_validators():
+    s = scheduler.record_success(scheduler.new_state("f"), NOW, entries(30), {"ETag": '"v1"'})
+    later = NOW + timedelta(hours=1)
+    s2 = scheduler.record_success(s, later, entries(0, now=later), {"ETag": '"v2"'}, stored=False)
+    assert s2["last_item_at"] == s["last_item_at"]
+    assert s2["etag"] == '"v1"'
+
+def test_max_age_lengthens_but_never_beyond_the_cap():
+    s = scheduler.record_success(scheduler.new_state("f"), NOW, entries(0, 5), {"Cache-Control": "max-age=3600"})
+    assert s["interval_s"] == 3600
+    s = scheduler.record_success(scheduler.new_state("f"), NOW, entries(0, 5), {"Cache-Control": "max-age=86400"})
+    assert s["interval_s"] == MAX_INTERVAL.total_seconds()
+    assert scheduler.max_age({"Cache-Control": "no-cache, max-age=3600"}) is None
@@ -0,0 +1,107 @@
+import json
+
+import pytest
+
+from grmm.peers import PeerGraph
+from grmm.refdata import Snapshot, build
+from signals import make_signals
+
+SOURCE = {
+    "sectors": [{"name": "Financials", "etf": "XLF", "beta": 1.1}],
+    "securities": [
+        {"ticker": t, "sector": "Financials", "aliases": []} for t in ("JPM", "GS", "MS", "BAC", "C")
+    ],
+    "priors": [{"event_type": "CEO_CHANGE", "sector": "*", "1D": -0.01, "5D": -0.004}],
+}
+
+
+@pytest.fixture(autouse=True)
+def graph(tmp_path, monkeypatch):
+    path = tmp_path / "snapshot.bin"
+    path.write_bytes(build(SOURCE))
+    g = PeerGraph(Snapshot(str(path)))
+    monkeypatch.setattr(make_signals, "graph", g)
+    monkeypatch.setattr(make_signals, "legacy_schema", False)
+    monkeypatch.setattr(make_signals, "log", lambda _: None)
+    return g
+
+def rows_for(*sizes):
+    return [{"event_id": e, "n": i} for e, size in enumerate(sizes, 1) for i in range(size)]
+
+def stub_post(monkeypatch, fail=lambda chunk: False):
+    posts = []
+    def post(chunk, conflict_ok=False):
+        posts.append(sorted({r["event_id"] for r in chunk}))
+        if fail(chunk):
+            raise RuntimeError("rejected")
+    monkeypatch.setattr(make_signals, "post_signals", post)
+    return posts
+
+
+def test_legs_are_deduped_primary_first(monkeypatch):
+    monkeypatch.setattr(make_signals, "MAX_PEERS", 2)
+    legs = make_signals.legs_for({"primary_ticker": "JPM", "affected_tickers": ["GS", "JPM", "GS", "XYZ"]})
+    assert legs == [("JPM", "primary"), ("GS", "affected"), ("XYZ", "affected"), ("BAC", "peer"), ("C", "peer")]
+    assert make_signals.legs_for({"primary_ticker": None, "affected_tickers": ["GS"]}) == \
+        [(None, "primary"), ("GS", "affected")]
+
+def test_fan_out_scales_legs_by_weight():
+    rows = make_signals.fan_out([{"event_id": 1, "event_type": "CEO_CHANGE", "primary_ticker": "JPM",
+                                  "affected_tickers": [], "sentiment": None}])
+    by_leg = {(r["ticker"], r["horizon"]): r for r in rows}
+    assert len(rows) == 2 * 5
+    assert by_leg["JPM", "1D"]["predicted_return"] == pytest.approx(-0.01)
+    assert by_leg["GS", "1D"]["predicted_return"] == pytest.approx(-0.01 * make_signals.LEG_WEIGHT["peer"])
+    assert by_leg["GS", "1D"]["role"] == "peer"
+    assert (by_leg["JPM", "1D"]["hedge_ticker"], by_leg["JPM", "1D"]["hedge_ratio"]) == ("XLF", 1.1)
+
+
+def test_chunks_never_split_an_event(monkeypatch):
+    monkeypatch.setattr(make_signals, "BULK_CHUNK", 3)
+    posts = stub_post(monkeypatch)
+    assert make_signals.insert_signal_rows(rows_for(2, 2, 4, 1, 1)) == set()
+    assert posts == [[1, 2], [3], [4, 5]]
+
+def test_a_failed_chunk_is_retried_per_event(monkeypatch):
+    monkeypatch.setattr(make_signals, "BULK_CHUNK", 3)
+    posts = stub_post(monkeypatch, fail=lambda chunk: any(r["event_id"] == 2 for r in chunk))
+    assert make_signals.insert_signal_rows(rows_for(2, 2, 1, 1)) == {2}
+    assert posts == [[1, 2], [1], [2], [3, 4]]
+
+def test_no_rows_no_posts(monkeypatch):
+    posts = stub_post(monkeypatch)
+    assert make_signals.insert_signal_rows([]) == set()
+    assert posts == []
+
+
+class Response:
+    def __init__(self, status_code, text=""):
+        self.status_code, self.text = status_code, text
+
+def stub_requests(monkeypatch, respond):
+    sent = []
+    def post(url, headers, data, timeout):
+        sent.append(json.loads(data))
+        return respond(sent[-1])
+    monkeypatch.setattr(make_signals.requests, "post", post)
+    return sent
+
+def test_409_is_only_success_for_a_single_event(monkeypatch):
+    stub_requests(monkeypatch, lambda rows: Response(409))
+    with pytest.raises(RuntimeError):
+        make_signals.post_signals(rows_for(1, 1))
+    make_signals.post_signals(rows_for(1), conflict_ok=True)
+
+def test_bulk_409_falls_back_to_per_event_posts(monkeypatch):
+    sent = stub_requests(monkeypatch, lambda rows: Response(409 if len(rows) > 1 else 201))
+    assert make_signals.insert_signal_rows(rows_for(1, 1, 1)) == set()
+    assert [len(rows) for rows in sent] == [3, 1, 1, 1]
+
+def test_missing_leg_columns_are_dropped_for_the_run(monkeypatch):
+    missing = Response(400, '{"code":"PGRST204","message":"Could not find the \'role\' column of \'signals\'"}')
+    sent = stub_requests(monkeypatch, lambda rows: missing if "role" in rows[0] else Response(201))
+    row = {"event_id": 1, "ticker": "JPM", "role": "primary", "hedge_ticker": "XLF",
+           "hedge_ratio": 1.1, "refdata_version": "v"}
+    make_signals.post_signals([row])
+    make_signals.post_signals([row])
+    assert [list(rows[0]) for rows in sent] == [list(row), ["event_id", "ticker"], ["event_id", "ticker"]]
@@ -0,0 +1,91 @@
+from datetime import datetime, timedelta, timezone
+
+from grmm.workqueue import DEFAULT_LEASE_S, MAX_ATTEMPTS, RETRY_DELAY_S, LocalQueue, drain
+
+
+class Clock:
+    def __init__(self):
+        self.now = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += timedelta(seconds=seconds)
+
+
+def queues(tmp_path):
+    clock = Clock()
+    path = str(tmp_path / "q.db")
+    return clock, LocalQueue(path, worker="a", clock=clock), LocalQueue(path, worker="b", clock=clock)
+
+def row(q, item_id, stage="events"):
+    return q.db.execute(
+        "select claimed_by, attempts, done_at is not null from work_queue where stage = ? and item_id = ?",
+        (stage, item_id)).fetchone()
+
+
+def test_claimed_items_are_hidden_until_the_lease_expires(tmp_path):
+    clock, a, b = queues(tmp_path)
+    a.enqueue("events", [1, 2])
+    assert a.claim("events") == [1, 2]
+    assert b.claim("events") == []
+
+    clock.advance(DEFAULT_LEASE_S + 1)
+    assert b.claim("events") == [1, 2]
+    assert row(b, 1) == ("b", 2, 0)
+
+def test_complete_is_ignored_from_a_worker_that_does_not_hold_the_item(tmp_path):
+    clock, a, b = queues(tmp_path)
+    a.enqueue("events", [1])
+    a.claim("events")
+    clock.advance(DEFAULT_LEASE_S + 1)
+    b.claim("events")
+
+    a.complete("events", [1])          # a's lease expired; b holds it now
+    assert row(a, 1) == ("b", 2, 0)
+    b.complete("events", [1])
+    assert row(a, 1) == ("b", 2, 1)
+    clock.advance(DEFAULT_LEASE_S + 1)
+    assert a.claim("events") == []
+
+def test_items_stop_being_claimed_after_max_attempts(tmp_path):
+    clock, a, _ = queues(tmp_path)
+    a.enqueue("events", [1])
+    for _ in range(MAX_ATTEMPTS):
+        assert a.claim("events") == [1]
+        a.release("events", [1])
+        clock.advance(RETRY_DELAY_S + 1)
+    assert a.claim("events") == []
+    assert row(a, 1) == ("a", MAX_ATTEMPTS, 0)
+
+def test_drain_completes_good_ids_and_releases_failed_ones(tmp_path):
+    clock, a, _ = queues(tmp_path)
+    a.enqueue("events", [1, 2, 3])
+    seen = []
+    def handle(ids):
+        seen.append(list(ids))
+        return [2]
+
+    assert drain(a, "events", handle, log=lambda _: None) == (2, 1)
+    assert seen == [[1, 2, 3]]           # the failed id isn't retried within the same run
+    assert row(a, 1)[2] == 1 and row(a, 3)[2] == 1
+    assert row(a, 2)[2] == 0
+
+    clock.advance(RETRY_DELAY_S + 1)
+    assert drain(a, "events", lambda ids: [], log=lambda _: None) == (1, 0)
+    assert row(a, 2)[2] == 1
+
+def test_failures_out_of_attempts_are_handed_to_give_up(tmp_path):
+    clock, a, _ = queues(tmp_path)
+    a.enqueue("sentiment", [1, 2])
+    def give_up(ids):
+        a.enqueue("signals", ids)
+
+    for _ in range(MAX_ATTEMPTS):
+        assert a.claim("signals") == []
+        drain(a, "sentiment", lambda ids: [1], log=lambda _: None, give_up=give_up)
+        clock.advance(RETRY_DELAY_S + 1)
+    assert a.claim("signals") == [1]
+    assert a.claim("sentiment") == []
+    assert row(a, 2, "sentiment")[2] == 1